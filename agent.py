@@ -1,32 +1,6 @@
-from agents import Agent, RunConfig
-from agents import OpenAIChatCompletionsModel
-from openai import AsyncOpenAI
-from dotenv import load_dotenv
-import os
-
-load_dotenv()
-
-gemini_api_key = os.getenv("GEMINI_API_KEY")
-if not gemini_api_key:
-    raise RuntimeError("GEMINI_API_KEY not set in .env file")
-
-external_client = AsyncOpenAI(
-    api_key=gemini_api_key,
-    base_url="https://generativelanguage.googleapis.com/v1beta/openai/",
-)
-
-model = OpenAIChatCompletionsModel(
-    model="gemini-2.0-flash",
-    openai_client=external_client
-)
-
-config = RunConfig(
-    model=model,
-    model_provider=external_client,
-    tracing_disabled=True
-)
-
 def create_career_mentor():
+    from agents import Agent
+
     return Agent(
         name="AI Career Mentor",
         instructions="""
@@ -60,4 +34,16 @@ Freelancing Gigs:
 • "Build responsive landing page" → $200-$500
 • "Fix React bugs" → $50-$150
 """,
-    )
\ No newline at end of file
+    )
+def create_history_summarizer():
+    from agents import Agent
+
+    return Agent(
+        name="Conversation Summarizer",
+        instructions="""
+You compress a career-mentoring conversation into a short running summary.
+Keep the user's background, skills, goals, constraints, decisions made and
+any advice or roadmap already given. Drop greetings and repetition.
+Return plain text, at most 200 words.
+""",
+    )
@@ -1,55 +1,28 @@
 import os
-import re
-from datetime import datetime
 from typing import Optional
-from fastapi import FastAPI, Request, HTTPException, Header, APIRouter
-from fastapi.middleware.cors import CORSMiddleware
+from fastapi import Request, HTTPException, Header, APIRouter
 from pydantic import BaseModel
-from dotenv import load_dotenv
-
-from agents import (
-    Agent,
-    Runner,
-    OpenAIChatCompletionsModel,
-    AsyncOpenAI,
-    RunConfig,
-    input_guardrail,
-    GuardrailFunctionOutput,
-    InputGuardrailTripwireTriggered
-)
 
-router = APIRouter(prefix="/ask", tags=["Ask"])
-
-
-load_dotenv()
-
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if not GEMINI_API_KEY:
-    raise RuntimeError("GEMINI_API_KEY not found in .env")
-
-
-external_client = AsyncOpenAI(
-    api_key=GEMINI_API_KEY,
-    base_url="https://generativelanguage.googleapis.com/v1beta/openai/"
-)
-
-
-model = OpenAIChatCompletionsModel(
-    model="gemini-2.0-flash",
-    openai_client=external_client
-)
+from utils.runner import run_agent
+from utils.scheduler import INTERACTIVE, scheduler
+from utils.llm import get_run_config
+from utils.ledger import create_ledger
+from utils.streaming import sse_event, sse_response, stream_text_deltas
+from utils.intent import GREETING, OFF_TOPIC, classify
+from utils.answer_cache import ANSWER_CACHE_ENABLED, AnswerCache
+from utils.metrics import CREDIT_TOKENS, cache_lookup, run_usage, timed
+from utils.tokens import count_tokens
+from utils.formatting import MarkdownNormalizer, normalize_markdown
 
+router = APIRouter(prefix="/ask", tags=["Ask"])
 
-config = RunConfig(
-    model=model,
-    tracing_disabled=True
-)
 
 
+ledger = create_ledger()
+answer_cache = AnswerCache() if ANSWER_CACHE_ENABLED else None
 
-CREDITS = {}
-DEFAULT_CREDIT_TOKENS = int(os.getenv("DEFAULT_CREDIT_TOKENS", "100000"))
-USER_NAMES = {}
+# Fraction of the normal estimate charged for an answer served from cache.
+CACHE_HIT_COST_RATIO = float(os.getenv("CACHE_HIT_COST_RATIO", "0.1"))
 
 
 
@@ -58,48 +31,68 @@ def get_user_id(header_user_id: Optional[str]) -> str:
 
 def get_user_name(user_id: str, header_user_name: Optional[str]) -> str:
     if header_user_name:
-        USER_NAMES[user_id] = header_user_name
-    return USER_NAMES.get(user_id, "there")
+        ledger.set_name(user_id, header_user_name)
+        return header_user_name
+    return ledger.get_name(user_id) or "there"
 
-def ensure_user_in_credits(user_id: str):
-    if user_id not in CREDITS:
-        CREDITS[user_id] = {
-            "tokens_left": DEFAULT_CREDIT_TOKENS,
-            "last_reset": datetime.utcnow()
-        }
+def tokens_left(user_id: str) -> int:
+    return ledger.balance(user_id)
 
 def deduct_tokens(user_id: str, tokens: int) -> bool:
-    ensure_user_in_credits(user_id)
-    if CREDITS[user_id]["tokens_left"] >= tokens:
-        CREDITS[user_id]["tokens_left"] -= tokens
-        return True
-    return False
+    if not ledger.debit(user_id, tokens):
+        CREDIT_TOKENS.inc("rejected", amount=tokens)
+        return False
+    CREDIT_TOKENS.inc("debit", amount=tokens)
+    return True
+
+def refund_tokens(user_id: str, tokens: int):
+    ledger.refund(user_id, tokens)
+    CREDIT_TOKENS.inc("refund", amount=tokens)
+
+GREETING_REPLY = "👋 Hello {name}! How can I help you with your studies today?"
+OFF_TOPIC_REPLY = "⚠️ Please ask only study-related questions."
+
+def estimate_tokens(text: str, max_tokens: Optional[int]) -> int:
+    max_tokens = min(1024, max_tokens or 512)
+    return max(1, count_tokens(text)) + max_tokens
 
+def settle_tokens(user_id: str, reserved: int, usage, fallback: Optional[int] = None) -> int:
+    """
+    Settle a reservation against the run's reported usage: refund what was
+    not used, or take the overage (up to the balance). Without reported
+    usage, `fallback` (or else the reservation) is charged. Returns tokens charged.
+    """
+    used = getattr(usage, "total_tokens", 0) or (reserved if fallback is None else fallback)
+    if used < reserved:
+        refund_tokens(user_id, reserved - used)
+    elif used > reserved:
+        extra = min(used - reserved, tokens_left(user_id))
+        if extra and ledger.debit(user_id, extra):
+            CREDIT_TOKENS.inc("debit", amount=extra)
+        else:
+            extra = 0
+        used = reserved + extra
+    return used
+
+def cached_answer(text: str) -> Optional[str]:
+    if answer_cache is None:
+        return None
+    answer = answer_cache.get(text)
+    cache_lookup("answer", answer is not None)
+    return answer
+
+def cache_answer(text: str, formatted: str):
+    if answer_cache is not None and formatted:
+        answer_cache.put(text, formatted)
+
+@timed("format_response")
 def format_response(text: str) -> str:
     """
     Cleans and enforces structured formatting from model output.
-    - Adds newlines after list items.
+    - Puts list items and headings on their own lines.
     - Preserves Markdown formatting.
     """
-
-    text = re.sub(r'(?<=\d\.)\s+', ' ', text)  
-    text = re.sub(r'(?<=\d\))\s+', ' ', text) 
-
-    
-    text = re.sub(r'(\d+\.\s+)', r'\n\1', text)
-    text = re.sub(r'(\d+\)\s+)', r'\n\1', text)
-    text = re.sub(r'([\-•]\s+)', r'\n\1', text)
-
-    
-    text = text.replace("\\n", "\n")
-
-    
-    text = re.sub(r'\n{3,}', '\n\n', text)
-
-    
-    return text.strip()
-
-
+    return normalize_markdown(text)
 
 
 class ChatRequest(BaseModel):
@@ -114,28 +107,13 @@ class ChatResponse(BaseModel):
     redirected_to: Optional[str] = None
     tokens_used_estimate: Optional[int] = None
     tokens_remaining: Optional[int] = None
-
-
-
-@input_guardrail
-async def study_guardrail(ctx, agent: Agent, user_input: str | list) -> GuardrailFunctionOutput:
-    text = user_input if isinstance(user_input, str) else " ".join(
-        item["content"] for item in user_input
-    )
-
-    study_keywords = [
-        "study", "explain", "summarize", "lecture", "homework", "exercise", "math",
-        "what", "why", "when", "how", "where", "solve",
-        "physics", "chemistry", "biology", "history", "essay", "exam", "concept", "cells"
-    ]
-    if not any(kw in text.lower() for kw in study_keywords):
-        return GuardrailFunctionOutput(output_info=None, tripwire_triggered=True)
-
-    return GuardrailFunctionOutput(output_info=None, tripwire_triggered=False)
+    cached: bool = False
 
 
 
 def create_study_agent():
+    from agents import Agent
+
     return Agent(
         name="UAARN Study Agent",
         instructions="""
@@ -159,7 +137,6 @@ Newton’s Laws of Motion
 
 Avoid any unrelated, harmful, or non-study topics.
 """,
-        input_guardrails=[study_guardrail]
     )
 
 
@@ -174,25 +151,38 @@ async def chat(
 ):
     user_id = get_user_id(x_user_id)
     user_name = get_user_name(user_id, x_user_name)
-    ensure_user_in_credits(user_id)
 
     text = req.message.strip()
     if not text:
         raise HTTPException(status_code=400, detail="Empty message")
 
-    
-    greetings = ["hi", "hello", "hey", "salam", "assalam", "assalamu", "assalamualaikum"]
-    if any(text.lower().startswith(g) for g in greetings):
+    intent = classify(text)
+    if intent == GREETING:
+        return ChatResponse(
+            reply=GREETING_REPLY.format(name=user_name),
+            tokens_used_estimate=0,
+            tokens_remaining=tokens_left(user_id)
+        )
+    if intent == OFF_TOPIC:
         return ChatResponse(
-            reply=f"👋 Hello {user_name}! How can I help you with your studies today?",
+            reply=OFF_TOPIC_REPLY,
             tokens_used_estimate=0,
-            tokens_remaining=CREDITS[user_id]["tokens_left"]
+            tokens_remaining=tokens_left(user_id)
         )
 
-   
-   
-    max_tokens = min(1024, req.max_tokens or 512)
-    estimated_tokens = max(1, int(len(text) / 4)) + max_tokens
+    estimated_tokens = estimate_tokens(text, req.max_tokens)
+
+    cached = cached_answer(text)
+    if cached is not None:
+        cost = max(1, int(estimated_tokens * CACHE_HIT_COST_RATIO))
+        if not deduct_tokens(user_id, cost):
+            raise HTTPException(status_code=402, detail="Insufficient tokens")
+        return ChatResponse(
+            reply=cached,
+            tokens_used_estimate=cost,
+            tokens_remaining=tokens_left(user_id),
+            cached=True
+        )
 
     if not deduct_tokens(user_id, estimated_tokens):
         raise HTTPException(status_code=402, detail="Insufficient tokens")
@@ -201,25 +191,123 @@ async def chat(
     user_prompt = f"User question: {text}"
 
     try:
-        result = await Runner.run(agent, user_prompt, run_config=config)
+        result = await run_agent(
+            agent, user_prompt, run_config=get_run_config("ask"), priority=INTERACTIVE, hedge="ask_chat"
+        )
         reply_text = getattr(result, "final_output", str(result))
         formatted = format_response(reply_text)
+        cache_answer(text, formatted)
 
-    except InputGuardrailTripwireTriggered:
-        return ChatResponse(
-            reply="⚠️ Please ask only study-related questions.",
-            redirected_to=None,
-            tokens_used_estimate=0,
-            tokens_remaining=CREDITS[user_id]["tokens_left"]
-        )
     except Exception as e:
         
-        CREDITS[user_id]["tokens_left"] += estimated_tokens
+        refund_tokens(user_id, estimated_tokens)
         raise HTTPException(status_code=500, detail=f"Agent error: {str(e)}")
 
+    used_tokens = settle_tokens(user_id, estimated_tokens, run_usage(result))
     return ChatResponse(
         reply=formatted,
-        tokens_used_estimate=estimated_tokens,
-        tokens_remaining=CREDITS[user_id]["tokens_left"]
+        tokens_used_estimate=used_tokens,
+        tokens_remaining=tokens_left(user_id)
     )
 
+
+@router.post("/api/chat/stream")
+async def chat_stream(
+    req: ChatRequest,
+    request: Request,
+    x_user_id: Optional[str] = Header(None),
+    x_user_name: Optional[str] = Header(None)
+):
+    """
+    Same as /api/chat but streams text deltas as server-sent events.
+    The final `done` event carries the formatted reply and credit accounting.
+    """
+    user_id = get_user_id(x_user_id)
+    user_name = get_user_name(user_id, x_user_name)
+
+    text = req.message.strip()
+    if not text:
+        raise HTTPException(status_code=400, detail="Empty message")
+
+    intent = classify(text)
+    if intent in (GREETING, OFF_TOPIC):
+        reply = GREETING_REPLY.format(name=user_name) if intent == GREETING else OFF_TOPIC_REPLY
+
+        async def local_events():
+            yield sse_event({
+                "reply": reply,
+                "tokens_used_estimate": 0,
+                "tokens_remaining": tokens_left(user_id),
+            }, event="done")
+        return sse_response(local_events())
+
+    estimated_tokens = estimate_tokens(text, req.max_tokens)
+
+    cached = cached_answer(text)
+    if cached is not None:
+        cost = max(1, int(estimated_tokens * CACHE_HIT_COST_RATIO))
+        if not deduct_tokens(user_id, cost):
+            raise HTTPException(status_code=402, detail="Insufficient tokens")
+
+        async def cached_events():
+            yield sse_event({"delta": cached})
+            yield sse_event({
+                "reply": cached,
+                "tokens_used_estimate": cost,
+                "tokens_remaining": tokens_left(user_id),
+                "cached": True,
+            }, event="done")
+        return sse_response(cached_events())
+
+    if not deduct_tokens(user_id, estimated_tokens):
+        raise HTTPException(status_code=402, detail="Insufficient tokens")
+
+    agent = create_study_agent()
+    user_prompt = f"User question: {text}"
+
+    async def events():
+        from agents import Runner
+
+        result = None
+        pieces = []
+        settled = False
+        try:
+            try:
+                async with scheduler.slot(INTERACTIVE):
+                    result = Runner.run_streamed(agent, user_prompt, run_config=get_run_config("ask"))
+                    normalizer = MarkdownNormalizer()
+                    async for delta in stream_text_deltas(result):
+                        piece = normalizer.feed(delta)
+                        if piece:
+                            pieces.append(piece)
+                            yield sse_event({"delta": piece})
+                    piece = normalizer.finish()
+                    if piece:
+                        pieces.append(piece)
+                        yield sse_event({"delta": piece})
+                formatted = "".join(pieces)
+                cache_answer(text, formatted)
+            except Exception as e:
+                refund_tokens(user_id, estimated_tokens)
+                settled = True
+                yield sse_event({"detail": f"Agent error: {str(e)}"}, event="error")
+                return
+
+            used_tokens = settle_tokens(user_id, estimated_tokens, run_usage(result))
+            settled = True
+            yield sse_event({
+                "reply": formatted,
+                "tokens_used_estimate": used_tokens,
+                "tokens_remaining": tokens_left(user_id),
+                "cached": False,
+            }, event="done")
+        finally:
+            if not settled:
+                # The client went away mid-stream (CancelledError/GeneratorExit).
+                if result is None:
+                    refund_tokens(user_id, estimated_tokens)
+                else:
+                    streamed = count_tokens(user_prompt) + count_tokens("".join(pieces))
+                    settle_tokens(user_id, estimated_tokens, run_usage(result), fallback=streamed)
+
+    return sse_response(events())
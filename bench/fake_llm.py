@@ -0,0 +1,200 @@
+"""
+Local OpenAI-compatible stand-in for the Gemini endpoint, used by the
+benchmarks. Serves POST /chat/completions (plain and streamed) with
+configurable first-token latency, token rate and injected errors.
+
+    python -m bench.fake_llm --port 8900 --latency 0.3 --tokens-per-second 80
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+from dataclasses import dataclass
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+_QUIZ_COUNT = re.compile(r"Generate (\d+) quiz")
+
+REPLY = """### Overview
+1. **First step:** Understand the core concepts before moving on.
+2. **Second step:** Practice with small, well-defined problems.
+3. **Third step:** Review mistakes and build on what worked.
+
+### Key points
+- Consistency matters more than intensity.
+- Use well-known resources and real-world projects.
+- Ask for feedback early and often."""
+
+
+@dataclass
+class FakeConfig:
+    latency: float = 0.2           # seconds before the first token
+    jitter: float = 0.05           # uniform +/- seconds added to latency
+    tail_rate: float = 0.0         # fraction of requests that wait tail_latency instead
+    tail_latency: float = 2.0
+    tokens_per_second: float = 100.0
+    reply_tokens: int = 0          # 0 = the canned reply as is
+    error_rate: float = 0.0        # fraction answered with HTTP 500
+    throttle_rate: float = 0.0     # fraction answered with HTTP 429
+    retry_after: float = 0.5
+    seed: int | None = None
+
+
+def _reply_text(body: dict, config: FakeConfig) -> str:
+    messages = json.dumps(body.get("messages", []))
+    if body.get("response_format"):
+        match = _QUIZ_COUNT.search(messages)
+        count = int(match.group(1)) if match else 5
+        return json.dumps({"questions": [
+            {
+                "question": f"Sample question {random.randrange(10 ** 9)}?",
+                "options": ["A", "B", "C", "D"],
+                "answer": "A",
+                "explanation": "A is correct.",
+            }
+            for _ in range(count)
+        ]})
+    if config.reply_tokens:
+        words = REPLY.split(" ")
+        return " ".join(words[i % len(words)] for i in range(config.reply_tokens))
+    return REPLY
+
+
+def _tokens(text: str) -> list[str]:
+    """Split into word-sized pieces that join back to the original text."""
+    return re.findall(r"\S+\s*|\s+", text)
+
+
+def _usage(body: dict, completion: str) -> dict:
+    prompt_tokens = max(1, len(json.dumps(body.get("messages", []))) // 4)
+    completion_tokens = max(1, len(completion) // 4)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+def create_app(config: FakeConfig | None = None) -> FastAPI:
+    config = config or FakeConfig()
+    if config.seed is not None:
+        random.seed(config.seed)
+    app = FastAPI()
+    app.state.config = config
+    app.state.requests = 0
+
+    def first_token_delay() -> float:
+        base = config.tail_latency if random.random() < config.tail_rate else config.latency
+        return max(0.0, base + random.uniform(-config.jitter, config.jitter))
+
+    @app.post("/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        roll = random.random()
+        if roll < config.throttle_rate:
+            return JSONResponse(
+                {"error": {"message": "Resource exhausted", "code": 429}},
+                status_code=429,
+                headers={"retry-after": str(config.retry_after)},
+            )
+        if roll < config.throttle_rate + config.error_rate:
+            return JSONResponse({"error": {"message": "Injected failure", "code": 500}}, status_code=500)
+
+        text = _reply_text(body, config)
+        pieces = _tokens(text)
+        per_token = 1 / config.tokens_per_second if config.tokens_per_second > 0 else 0.0
+        created = int(time.time())
+
+        if not body.get("stream"):
+            await asyncio.sleep(first_token_delay() + per_token * len(pieces))
+            return {
+                "id": "chatcmpl-bench",
+                "object": "chat.completion",
+                "created": created,
+                "model": body.get("model", "fake"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": text},
+                    "finish_reason": "stop",
+                }],
+                "usage": _usage(body, text),
+            }
+
+        def chunk(delta: dict, finish_reason: str | None = None, usage: dict | None = None) -> str:
+            payload = {
+                "id": "chatcmpl-bench",
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": body.get("model", "fake"),
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            if usage:
+                payload["usage"] = usage
+            return f"data: {json.dumps(payload)}\n\n"
+
+        async def events():
+            await asyncio.sleep(first_token_delay())
+            yield chunk({"role": "assistant", "content": ""})
+            for piece in pieces:
+                yield chunk({"content": piece})
+                if per_token:
+                    await asyncio.sleep(per_token)
+            yield chunk({}, "stop", _usage(body, text))
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/stats")
+    async def stats():
+        return {"requests": app.state.requests}
+
+    return app
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    defaults = FakeConfig()
+    parser.add_argument("--latency", type=float, default=defaults.latency, help="seconds to first token")
+    parser.add_argument("--jitter", type=float, default=defaults.jitter)
+    parser.add_argument("--tail-rate", type=float, default=defaults.tail_rate,
+                        help="fraction of requests delayed by --tail-latency (slow upstream tail)")
+    parser.add_argument("--tail-latency", type=float, default=defaults.tail_latency)
+    parser.add_argument("--tokens-per-second", type=float, default=defaults.tokens_per_second)
+    parser.add_argument("--reply-tokens", type=int, default=defaults.reply_tokens)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument("--throttle-rate", type=float, default=defaults.throttle_rate)
+    parser.add_argument("--retry-after", type=float, default=defaults.retry_after)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+
+
+def config_from_args(args: argparse.Namespace) -> FakeConfig:
+    return FakeConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        tail_rate=args.tail_rate,
+        tail_latency=args.tail_latency,
+        tokens_per_second=args.tokens_per_second,
+        reply_tokens=args.reply_tokens,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    add_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(create_app(config_from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Microbenchmark for reply formatting: the previous seven-pass regex
+format_response against utils.formatting, on whole replies and fed in
+stream-sized chunks.
+
+    python -m bench.format_bench
+    python -m bench.format_bench --sizes 10000 1000000 --chunk 16
+"""
+import argparse
+import re
+import time
+
+from bench.fake_llm import REPLY
+from utils.formatting import MarkdownNormalizer, normalize_markdown
+
+
+def legacy_format_response(text: str) -> str:
+    """ask.format_response before the single-pass normalizer, kept as the reference."""
+    text = re.sub(r'(?<=\d\.)\s+', ' ', text)
+    text = re.sub(r'(?<=\d\))\s+', ' ', text)
+    text = re.sub(r'(\d+\.\s+)', r'\n\1', text)
+    text = re.sub(r'(\d+\)\s+)', r'\n\1', text)
+    text = re.sub(r'([\-•]\s+)', r'\n\1', text)
+    text = text.replace("\\n", "\n")
+    text = re.sub(r'\n{3,}', '\n\n', text)
+    return text.strip()
+
+
+def streamed(text: str, chunk: int) -> str:
+    normalizer = MarkdownNormalizer()
+    pieces = [normalizer.feed(text[i:i + chunk]) for i in range(0, len(text), chunk)]
+    pieces.append(normalizer.finish())
+    return "".join(pieces)
+
+
+def sample(size: int) -> str:
+    """Model-like reply: the canned answer run together on one line, as models often send it."""
+    block = REPLY.replace("\n", " ") + " "
+    return (block * (size // len(block) + 1))[:size]
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--chunk", type=int, default=16, help="characters per fed chunk (about 4 tokens)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'size':>9}  {'legacy':>10}  {'single-pass':>11}  {'streamed':>10}")
+    for size in args.sizes:
+        text = sample(size)
+        assert streamed(text, args.chunk) == normalize_markdown(text)
+        legacy = best_of(lambda: legacy_format_response(text), args.repeat)
+        single = best_of(lambda: normalize_markdown(text), args.repeat)
+        stream = best_of(lambda: streamed(text, args.chunk), args.repeat)
+        print(f"{size:>9}  {legacy * 1000:>8.2f}ms  {single * 1000:>9.2f}ms  {stream * 1000:>8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,469 @@
+"""
+Load-test every router against the local fake LLM, fully offline.
+
+Starts bench.fake_llm and the app (uvicorn main:app) as subprocesses, drives
+each scenario at a fixed concurrency and writes throughput, latency
+percentiles, time to first byte and app memory to a JSON file.
+
+    python -m bench.run                          # all scenarios
+    python -m bench.run -s ask_chat -s quiz -c 32 -n 500
+    python -m bench.run --latency 0.5 --error-rate 0.05 --baseline bench/results/old.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable
+
+import httpx
+
+from bench.fake_llm import add_arguments, config_from_args
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "bench", "results")
+VIDEO_ID = "benchVideo1"
+
+CV_TEXT = """Jane Doe - Software Engineer
+Experience: 4 years building Python web services with FastAPI and PostgreSQL.
+Led migration of a monolith to containerised services; cut deploy time by 60%.
+Skills: Python, SQL, Docker, Kubernetes, AWS, CI/CD, testing.
+Education: BSc Computer Science.
+"""
+
+LONG_TEXT = "\n\n".join(
+    f"Section {n}. The lecture covers how cells convert light into chemical energy, "
+    "the role of chlorophyll, and how the Calvin cycle fixes carbon dioxide into sugar. "
+    "Students compare aerobic and anaerobic respiration and discuss energy yield."
+    for n in range(40)
+)
+
+ROADMAP = """### Roadmap
+1. **Foundations:** Python, SQL and statistics.
+2. **Projects:** build two end-to-end data pipelines.
+- Publish your work on GitHub.
+- Apply for internships.
+"""
+
+
+@dataclass
+class Scenario:
+    name: str
+    path: str
+    build: Callable[[int], dict]
+    stream: bool = False
+    method: str = "POST"
+    description: str = ""
+
+
+def _json(payload: Callable[[int], dict]) -> Callable[[int], dict]:
+    return lambda i: {"json": payload(i)}
+
+
+SCENARIOS = [
+    Scenario("career_chat", "/careerapi/chat",
+             _json(lambda i: {"message": f"How do I move into data engineering? (case {i})"})),
+    Scenario("career_chat_stream", "/careerapi/chat/stream",
+             _json(lambda i: {"message": f"Which skills should I learn next? (case {i})"}), stream=True),
+    Scenario("career_upload_cv", "/careerapi/upload-cv",
+             lambda i: {"files": {"file": (f"cv-{i}.txt", f"{CV_TEXT}\nReference {i}".encode(), "text/plain")}}),
+    Scenario("career_tts", "/careerapi/tts", _json(lambda i: {"text": ROADMAP}), stream=True),
+    Scenario("career_pdf", "/careerapi/download/pdf", _json(lambda i: {"text": ROADMAP * 5})),
+    Scenario("career_docx", "/careerapi/download/docx", _json(lambda i: {"text": ROADMAP * 5})),
+    Scenario("ask_chat", "/ask/api/chat",
+             lambda i: {"json": {"message": f"Explain photosynthesis for exam question {i}"},
+                        "headers": {"x-user-id": f"bench-{i % 50}"}}),
+    Scenario("ask_chat_cached", "/ask/api/chat",
+             lambda i: {"json": {"message": "Explain the water cycle in simple steps"},
+                        "headers": {"x-user-id": f"bench-{i % 50}"}},
+             description="same question every time, served from the answer cache"),
+    Scenario("ask_chat_stream", "/ask/api/chat/stream",
+             lambda i: {"json": {"message": f"Explain Newton's laws for homework {i}"},
+                        "headers": {"x-user-id": f"bench-{i % 50}"}}, stream=True),
+    Scenario("quiz", "/quiz/", _json(lambda i: {"topic": f"algebra unit {i}", "count": 5})),
+    Scenario("quiz_pooled", "/quiz/", _json(lambda i: {"topic": "world history", "count": 5}),
+             description="one topic, served from the pre-generated pool after the first call"),
+    Scenario("quiz_stream", "/quiz/stream", _json(lambda i: {"topic": f"geometry unit {i}", "count": 5}),
+             stream=True),
+    Scenario("summarize_text", "/summarize/api/agent/summarize",
+             _json(lambda i: {"source": "text", "text": f"{LONG_TEXT}\n\nCase {i}."})),
+    Scenario("summarize_youtube", "/summarize/api/agent/summarize",
+             _json(lambda i: {"source": "youtube", "link": f"https://youtu.be/{VIDEO_ID}?t={i}"})),
+    Scenario("summarize_upload", "/summarize/api/agent/upload",
+             lambda i: {"files": {"file": (f"notes-{i}.txt", f"{LONG_TEXT}\n\nCase {i}.".encode(), "text/plain")}}),
+    Scenario("summarize_tts", "/summarize/api/agent/tts", _json(lambda i: {"text": LONG_TEXT[:3000]}), stream=True),
+    Scenario("summarize_pdf", "/summarize/api/agent/download/pdf", _json(lambda i: {"text": LONG_TEXT})),
+]
+
+
+def percentile(values: list[float], p: float) -> float | None:
+    """Nearest-rank percentile of values (0 < p <= 100)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * p // 100))
+    return ordered[int(rank) - 1]
+
+
+def _summary(values: list[float]) -> dict:
+    if not values:
+        return {}
+    return {
+        "mean": sum(values) / len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values),
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _children(pid: int) -> list[int]:
+    pids = []
+    try:
+        for task in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                pids.extend(int(p) for p in f.read().split())
+    except OSError:
+        pass
+    return pids
+
+
+def _status_kb(pid: int, field_name: str) -> int:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith(field_name + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def rss_bytes(pid: int) -> int | None:
+    """Resident memory of pid and all its descendants (Linux only)."""
+    if not os.path.exists(f"/proc/{pid}"):
+        return None
+    total, stack = 0, [pid]
+    while stack:
+        current = stack.pop()
+        total += _status_kb(current, "VmRSS") * 1024
+        stack.extend(_children(current))
+    return total
+
+
+class MemorySampler:
+    def __init__(self, pid: int, interval: float = 0.1):
+        self.pid = pid
+        self.interval = interval
+        self.peak = 0
+        self._task: asyncio.Task | None = None
+
+    async def _sample(self):
+        while True:
+            self.peak = max(self.peak, rss_bytes(self.pid) or 0)
+            await asyncio.sleep(self.interval)
+
+    def __enter__(self):
+        self.peak = rss_bytes(self.pid) or 0
+        self._task = asyncio.create_task(self._sample())
+        return self
+
+    def __exit__(self, *exc):
+        self._task.cancel()
+
+
+@dataclass
+class Sample:
+    latency: float
+    ttfb: float
+    status: int
+    error: str | None = None
+    bytes: int = 0
+
+
+async def _request(client: httpx.AsyncClient, scenario: Scenario, i: int) -> Sample:
+    start = time.perf_counter()
+    ttfb = None
+    size = 0
+    tail = b""
+    try:
+        async with client.stream(scenario.method, scenario.path, **scenario.build(i)) as response:
+            async for chunk in response.aiter_raw():
+                if ttfb is None:
+                    ttfb = time.perf_counter() - start
+                size += len(chunk)
+                tail = (tail + chunk)[-512:]
+            status = response.status_code
+        # SSE endpoints report upstream failures in-band after a 200.
+        error = "stream error" if b"event: error" in tail else None
+    except httpx.HTTPError as e:
+        status, error = 0, type(e).__name__
+    latency = time.perf_counter() - start
+    return Sample(latency=latency, ttfb=ttfb if ttfb is not None else latency, status=status, error=error, bytes=size)
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    scenario: Scenario,
+    requests: int,
+    concurrency: int,
+    warmup: int,
+    app_pid: int,
+) -> dict:
+    for i in range(warmup):
+        await _request(client, scenario, -1 - i)
+
+    samples: list[Sample] = []
+    next_index = iter(range(requests))
+
+    async def worker():
+        for i in next_index:
+            samples.append(await _request(client, scenario, i))
+
+    rss_before = rss_bytes(app_pid)
+    with MemorySampler(app_pid) as memory:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    ok = [s for s in samples if s.error is None and 200 <= s.status < 400]
+    failed = len(samples) - len(ok)
+    statuses: dict[str, int] = {}
+    for s in samples:
+        key = s.error or str(s.status)
+        statuses[key] = statuses.get(key, 0) + 1
+
+    return {
+        "path": scenario.path,
+        "description": scenario.description,
+        "requests": len(samples),
+        "concurrency": concurrency,
+        "errors": failed,
+        "error_rate": failed / len(samples) if samples else 0.0,
+        "statuses": statuses,
+        "elapsed_seconds": elapsed,
+        "throughput_rps": len(ok) / elapsed if elapsed else 0.0,
+        "latency_seconds": _summary([s.latency for s in ok]),
+        "ttfb_seconds": _summary([s.ttfb for s in ok]) if scenario.stream else {},
+        "response_bytes_mean": sum(s.bytes for s in ok) / len(ok) if ok else 0,
+        "memory": {
+            "rss_before_bytes": rss_before,
+            "rss_after_bytes": rss_bytes(app_pid),
+            "rss_peak_bytes": memory.peak or None,
+        },
+    }
+
+
+def _wait_ready(url: str, process: subprocess.Popen, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {process.returncode}")
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    raise RuntimeError(f"{url} not ready after {timeout}s")
+
+
+def _write_transcript_fixture(directory: str):
+    snippets = [
+        {"text": f"In this part we discuss topic {n} of the lecture on cell biology.", "start": n * 12.0, "duration": 12.0}
+        for n in range(300)
+    ]
+    with open(os.path.join(directory, f"{VIDEO_ID}.json"), "w", encoding="utf-8") as f:
+        json.dump(snippets, f)
+
+
+def app_environment(llm_url: str, workdir: str) -> dict:
+    """Environment for an offline app: fake LLM, silent TTS, throwaway state."""
+    transcripts = os.path.join(workdir, "transcripts")
+    os.makedirs(transcripts, exist_ok=True)
+    _write_transcript_fixture(transcripts)
+    env = dict(os.environ)
+    env.update({
+        "GEMINI_API_KEY": "bench",
+        "GEMINI_BASE_URL": llm_url,
+        "TTS_BACKEND": "silent",
+        "CREDIT_LEDGER": "memory",
+        "DEFAULT_CREDIT_TOKENS": str(10 ** 12),
+        "SESSION_STORE": "memory",
+        "TRANSCRIPT_CACHE_DIR": transcripts,
+        "QUIZ_POPULAR_PATH": os.path.join(workdir, "quiz_popular.json"),
+        "ARTIFACT_DIR": os.path.join(workdir, "artifacts"),
+        "JOB_DB_PATH": os.path.join(workdir, "jobs.db"),
+        "QUIZ_WARM_TOPICS": "",
+        "PYTHONUNBUFFERED": "1",
+    })
+    return env
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline: dict, current: dict) -> list[str]:
+    lines = [f"{'scenario':<22} {'rps':>16} {'p50 ms':>18} {'p99 ms':>18}"]
+
+    def fmt(old, new, scale=1.0):
+        if old is None or new is None:
+            return "-"
+        change = (new - old) / old * 100 if old else 0.0
+        return f"{new * scale:.1f} ({change:+.0f}%)"
+
+    for name, result in current["scenarios"].items():
+        old = baseline.get("scenarios", {}).get(name)
+        if not old:
+            continue
+        lines.append(
+            f"{name:<22} {fmt(old['throughput_rps'], result['throughput_rps']):>16} "
+            f"{fmt(old['latency_seconds'].get('p50'), result['latency_seconds'].get('p50'), 1000):>18} "
+            f"{fmt(old['latency_seconds'].get('p99'), result['latency_seconds'].get('p99'), 1000):>18}"
+        )
+    return lines
+
+
+def _print_table(results: dict):
+    print(f"{'scenario':<22} {'ok':>6} {'err':>5} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'peak MB':>8}")
+    for name, r in results.items():
+        lat = r["latency_seconds"]
+        ms = lambda key: f"{lat[key] * 1000:.1f}" if lat.get(key) is not None else "-"
+        peak = r["memory"]["rss_peak_bytes"]
+        print(
+            f"{name:<22} {r['requests'] - r['errors']:>6} {r['errors']:>5} {r['throughput_rps']:>8.1f} "
+            f"{ms('p50'):>8} {ms('p95'):>8} {ms('p99'):>8} {(peak or 0) / 2 ** 20:>8.1f}"
+        )
+
+
+async def _drive(args, app_url: str, app_pid: int, scenarios: list[Scenario]) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+    timeout = httpx.Timeout(args.timeout)
+    results = {}
+    async with httpx.AsyncClient(base_url=app_url, limits=limits, timeout=timeout) as client:
+        for scenario in scenarios:
+            print(f"running {scenario.name} ...", file=sys.stderr)
+            results[scenario.name] = await run_scenario(
+                client, scenario, args.requests, args.concurrency, args.warmup, app_pid
+            )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-s", "--scenario", action="append", help="scenario name (repeatable; default all)")
+    parser.add_argument("-n", "--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("-c", "--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the app")
+    parser.add_argument("--output", help="result file (default bench/results/<time>-<commit>.json)")
+    parser.add_argument("--baseline", help="earlier result file to compare against")
+    parser.add_argument("--list", action="store_true", help="list scenarios and exit")
+    parser.add_argument("-v", "--verbose", action="store_true", help="show the app's own log output")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    if args.list:
+        for s in SCENARIOS:
+            print(f"{s.name:<22} {s.path}  {s.description}")
+        return
+
+    by_name = {s.name: s for s in SCENARIOS}
+    unknown = [name for name in args.scenario or [] if name not in by_name]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+    scenarios = [by_name[name] for name in args.scenario] if args.scenario else SCENARIOS
+
+    llm_port, app_port = _free_port(), _free_port()
+    llm_url = f"http://127.0.0.1:{llm_port}/"
+    app_url = f"http://127.0.0.1:{app_port}"
+    fake_args = [
+        "--latency", str(args.latency), "--jitter", str(args.jitter),
+        "--tail-rate", str(args.tail_rate), "--tail-latency", str(args.tail_latency),
+        "--tokens-per-second", str(args.tokens_per_second), "--reply-tokens", str(args.reply_tokens),
+        "--error-rate", str(args.error_rate), "--throttle-rate", str(args.throttle_rate),
+        "--retry-after", str(args.retry_after),
+    ]
+    if args.seed is not None:
+        fake_args += ["--seed", str(args.seed)]
+
+    processes = []
+    with tempfile.TemporaryDirectory(prefix="uaarn-bench-") as workdir:
+        try:
+            llm = subprocess.Popen(
+                [sys.executable, "-m", "bench.fake_llm", "--port", str(llm_port), *fake_args], cwd=ROOT
+            )
+            processes.append(llm)
+            _wait_ready(f"{llm_url}stats", llm)
+
+            app = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "main:app", "--port", str(app_port),
+                 "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"],
+                cwd=ROOT, env=app_environment(llm_url, workdir),
+                stdout=None if args.verbose else subprocess.DEVNULL,
+                stderr=None if args.verbose else subprocess.DEVNULL,
+            )
+            processes.append(app)
+            _wait_ready(f"{app_url}/", app)
+
+            started = time.time()
+            results = asyncio.run(_drive(args, app_url, app.pid, scenarios))
+        finally:
+            for process in reversed(processes):
+                process.terminate()
+            for process in processes:
+                try:
+                    process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+
+    report = {
+        "meta": {
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(started)),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "warmup": args.warmup,
+            "workers": args.workers,
+        },
+        "fake_llm": asdict(config_from_args(args)),
+        "scenarios": results,
+    }
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(started))}-{report['meta']['commit'] or 'nogit'}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    _print_table(results)
+    print(f"\nresults written to {output}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            print("\n" + "\n".join(compare(json.load(f), report)))
+
+
+if __name__ == "__main__":
+    main()
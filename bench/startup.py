@@ -0,0 +1,141 @@
+"""
+Cold-start benchmark. Each run uses fresh processes and measures:
+
+- import: seconds to `import main` in a new interpreter
+- ready: seconds from spawning uvicorn to the first 200 on GET /
+- first_request: duration of the first model-backed request, sent --delay
+  seconds after the app is ready (bench.fake_llm adds no latency, so this
+  is almost all lazy imports and client setup)
+
+    python -m bench.startup -n 5 --output startup.json
+    python -m bench.startup --env WARMUP_ON_START=1 --delay 2
+    python -m bench.startup --popular-topics 10
+
+--popular-topics writes a quiz popularity file first, as a previous run
+leaves behind, so startup sees the topics it would warm.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from bench.run import ROOT, _free_port, _git_commit, _wait_ready, app_environment
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+
+
+def _wait_status(request, process: subprocess.Popen, timeout: float = 60.0) -> float:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"app exited with code {process.returncode}")
+        try:
+            if request().status_code == 200:
+                return time.perf_counter()
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.01)
+    raise RuntimeError(f"app not ready after {timeout}s")
+
+
+def write_popularity(path: str, topics: int):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({f"topic {i}": topics - i for i in range(topics)}, f)
+
+
+def measure_import(env: dict) -> float:
+    out = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def measure_server(env: dict, first_request: str, delay: float) -> dict:
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    app = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        ready = _wait_status(lambda: httpx.get(f"{url}/", timeout=1.0), app) - start
+        time.sleep(delay)
+        sent = time.perf_counter()
+        response = httpx.post(f"{url}{first_request}", json={"message": "Explain gravity for class"}, timeout=30.0)
+        response.raise_for_status()
+        first_request_seconds = time.perf_counter() - sent
+    finally:
+        app.terminate()
+        app.wait(timeout=10)
+    return {"ready": ready, "first_request": first_request_seconds}
+
+
+def _stats(values: list[float]) -> dict:
+    return {
+        "median": statistics.median(values),
+        "min": min(values),
+        "max": max(values),
+        "runs": values,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--runs", type=int, default=5)
+    parser.add_argument("--first-request", default="/ask/api/chat", help="LLM-backed POST route to time")
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds between ready and the first request")
+    parser.add_argument("--popular-topics", type=int, default=0,
+                        help="start with a quiz popularity file holding this many topics")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--env", action="append", default=[], metavar="NAME=VALUE",
+                        help="extra app environment, e.g. --env WARMUP_ON_START=1 (repeatable)")
+    args = parser.parse_args()
+
+    llm_port = _free_port()
+    llm = subprocess.Popen(
+        [sys.executable, "-m", "bench.fake_llm", "--port", str(llm_port), "--latency", "0", "--jitter", "0",
+         "--tokens-per-second", "0"],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    results = {"import": [], "ready": [], "first_request": []}
+    try:
+        _wait_ready(f"http://127.0.0.1:{llm_port}/stats", llm)
+        with tempfile.TemporaryDirectory(prefix="uaarn-startup-") as workdir:
+            env = app_environment(f"http://127.0.0.1:{llm_port}/", workdir)
+            env.update(item.split("=", 1) for item in args.env)
+            for _ in range(args.runs):
+                if args.popular_topics:
+                    write_popularity(env["QUIZ_POPULAR_PATH"], args.popular_topics)
+                results["import"].append(measure_import(env))
+                server = measure_server(env, args.first_request, args.delay)
+                results["ready"].append(server["ready"])
+                results["first_request"].append(server["first_request"])
+    finally:
+        llm.terminate()
+        llm.wait(timeout=10)
+
+    report = {
+        "commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "env": args.env,
+        "delay": args.delay,
+        "popular_topics": args.popular_topics,
+        **{name: _stats(values) for name, values in results.items()},
+    }
+    for name in results:
+        print(f"{name:<14} median {report[name]['median']:.3f}s  min {report[name]['min']:.3f}s")
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
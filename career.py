@@ -0,0 +1,156 @@
+import io
+import os
+import asyncio
+import logging
+from fastapi import APIRouter, HTTPException, Request, UploadFile, File
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from agent import create_career_mentor, create_history_summarizer
+from jobs import job_manager, submit_job
+from utils.llm import get_run_config
+from utils.runner import run_agent
+from utils.scheduler import ANALYSIS, BULK, INTERACTIVE, scheduler
+from utils.sessions import compact_session, create_session_store
+from utils.artifacts import artifact_key, cached_json, json_response, not_modified
+from utils.export import export_response
+from utils.extract import extract_upload
+from utils.tts import speech_response
+from utils.streaming import sse_event, sse_response, stream_text_deltas
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/careerapi", tags=["Career"])
+
+# Upper bound on CV text sent for analysis.
+CV_MAX_TOKENS = int(os.getenv("CV_MAX_TOKENS", "8000"))
+
+sessions = create_session_store()
+_background_tasks: set[asyncio.Task] = set()
+
+async def summarize_history(previous_summary: str, turns: list[dict]) -> str:
+    transcript = "\n".join(f"{t['role']}: {t['content']}" for t in turns)
+    prompt = f"Previous summary:\n{previous_summary or '(none)'}\n\nNew conversation turns:\n{transcript}"
+    result = await run_agent(create_history_summarizer(), prompt, run_config=get_run_config("career"), priority=BULK)
+    return result.final_output
+
+def chat_input(req: "ChatRequest"):
+    """The message alone, or with the user's session history when user_id is set."""
+    if not req.user_id:
+        return req.message
+    return sessions.load(req.user_id).to_input(req.message)
+
+def remember_turn(req: "ChatRequest", reply: str):
+    if not req.user_id:
+        return
+    session = sessions.load(req.user_id)
+    session.add_turn(req.message, reply)
+    sessions.save(session)
+    task = asyncio.create_task(compact_session(sessions, req.user_id, summarize_history))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+class ChatRequest(BaseModel):
+    message: str
+    user_id: str | None = None
+
+class ChatResponse(BaseModel):
+    reply: str
+
+class TTSRequest(BaseModel):
+    text: str
+
+@router.post("/chat", response_model=ChatResponse)
+async def career_chat(req: ChatRequest):
+    if not req.message.strip():
+        raise HTTPException(status_code=400, detail="Message cannot be empty")
+
+    agent = create_career_mentor()
+    try:
+        logger.info(f"Career chat: {req.message[:100]}")
+        result = await run_agent(
+            agent, chat_input(req), run_config=get_run_config("career"), priority=INTERACTIVE, hedge="career_chat"
+        )
+        reply = result.final_output or "I'm your AI Career Mentor! How can I help you today?"
+        remember_turn(req, reply)
+        return ChatResponse(reply=reply)
+    except Exception as e:
+        logger.error(f"Agent error: {e}")
+        raise HTTPException(status_code=500, detail="Mentor is busy. Try again!")
+
+@router.post("/chat/stream")
+async def career_chat_stream(req: ChatRequest):
+    if not req.message.strip():
+        raise HTTPException(status_code=400, detail="Message cannot be empty")
+
+    agent = create_career_mentor()
+    logger.info(f"Career chat (stream): {req.message[:100]}")
+
+    async def events():
+        from agents import Runner
+
+        try:
+            async with scheduler.slot(INTERACTIVE):
+                result = Runner.run_streamed(agent, chat_input(req), run_config=get_run_config("career"))
+                async for delta in stream_text_deltas(result):
+                    yield sse_event({"delta": delta})
+            reply = result.final_output or "I'm your AI Career Mentor! How can I help you today?"
+            remember_turn(req, reply)
+            yield sse_event({"reply": reply}, event="done")
+        except Exception as e:
+            logger.error(f"Agent error: {e}")
+            yield sse_event({"detail": "Mentor is busy. Try again!"}, event="error")
+
+    return sse_response(events())
+
+async def read_cv(file: UploadFile) -> str:
+    text = await extract_upload(file, max_tokens=CV_MAX_TOKENS)
+    if len(text.strip()) < 50:
+        raise HTTPException(status_code=400, detail="CV too short")
+    return text
+
+async def analyze_cv(payload: dict) -> dict:
+    async def analyze():
+        agent = create_career_mentor()
+        prompt = f"Analyze this CV and give detailed feedback:\n\n{payload['text']}"
+        result = await run_agent(agent, prompt, run_config=get_run_config("cv"), priority=ANALYSIS)
+        return {"analysis": result.final_output}
+
+    return await cached_json(artifact_key("cv_analysis", payload["text"]), analyze)
+
+job_manager.register("cv_analysis", analyze_cv)
+
+@router.post("/upload-cv")
+async def upload_cv(request: Request, file: UploadFile = File(...)):
+    text = await read_cv(file)
+    key = artifact_key("cv_analysis", text)
+    return not_modified(request, key) or json_response(await analyze_cv({"text": text}), key)
+
+@router.post("/upload-cv/jobs", status_code=202)
+async def upload_cv_job(file: UploadFile = File(...)):
+    """Queue the CV analysis and return a job ID; follow it at /jobs/{id}."""
+    return submit_job("cv_analysis", {"text": await read_cv(file)})
+
+@router.post("/tts")
+async def tts(req: TTSRequest, request: Request):
+    return await speech_response(
+        req.text,
+        headers={"Content-Disposition": "attachment; filename=career-advice.mp3"},
+        request=request,
+    )
+
+@router.post("/download/txt")
+async def download_txt(req: TTSRequest):
+    return StreamingResponse(
+        io.BytesIO(req.text.encode('utf-8')),
+        media_type="text/plain",
+        headers={"Content-Disposition": "attachment; filename=career-roadmap.txt"}
+    )
+
+@router.post("/download/pdf")
+async def download_pdf(req: TTSRequest, request: Request):
+    return await export_response(req.text, "pdf", "career-roadmap", request)
+
+@router.post("/download/docx")
+async def download_docx(req: TTSRequest, request: Request):
+    return await export_response(req.text, "docx", "career-roadmap", request)
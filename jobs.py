@@ -0,0 +1,71 @@
+import os
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse
+
+from utils.jobs import FINISHED, JobManager, JobQueueFull
+from utils.streaming import sse_event, sse_response
+
+# Seconds between SSE keep-alive comments while a job is running.
+JOB_EVENT_KEEPALIVE = float(os.getenv("JOB_EVENT_KEEPALIVE", "15"))
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+job_manager = JobManager()
+
+def submit_job(kind: str, payload: dict) -> JSONResponse:
+    """Queue a job and answer 202 with its ID and where to follow it."""
+    try:
+        job, created = job_manager.submit(kind, payload)
+    except JobQueueFull:
+        raise HTTPException(status_code=503, detail="Too many jobs queued. Try again later.")
+    return JSONResponse(
+        status_code=202,
+        content={
+            "job_id": job["id"],
+            "status": job["status"],
+            "deduplicated": not created,
+            "status_url": f"/jobs/{job['id']}",
+            "events_url": f"/jobs/{job['id']}/events",
+        },
+        headers={"Location": f"/jobs/{job['id']}"},
+    )
+
+@router.get("/{job_id}")
+async def get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job
+
+@router.get("/{job_id}/events")
+async def job_events(job_id: str):
+    """
+    Server-sent events for a job: a `status` event on every change, then a
+    final `done` (with the result) or `error` event.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+
+    async def events():
+        current, last_status = job, None
+        while True:
+            if current is None:
+                yield sse_event({"detail": "Job not found or expired"}, event="error")
+                return
+            if current["status"] != last_status:
+                last_status = current["status"]
+                if last_status in FINISHED:
+                    break
+                yield sse_event({"id": job_id, "status": last_status}, event="status")
+            else:
+                # Keeps proxies from timing out an idle connection.
+                yield ": keep-alive\n\n"
+            current = await job_manager.wait(job_id, JOB_EVENT_KEEPALIVE)
+
+        if current["status"] == "done":
+            yield sse_event({"id": job_id, "result": current["result"]}, event="done")
+        else:
+            yield sse_event({"id": job_id, "detail": current["error"]}, event="error")
+
+    return sse_response(events())
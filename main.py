@@ -1,101 +1,93 @@
-import io
-from fastapi import FastAPI, HTTPException, UploadFile, File
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
+from fastapi.responses import Response
 import logging
 
-from quiz import router as quiz_router
-from summarize import router as summarize_router
-from ask import router as ask_router
-
-from agent import create_career_mentor, config
-from agents import Runner
-from utils.tts_pdf import text_to_speech_bytes, text_to_pdf_bytes
+from utils.settings import get_settings
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="UAARN + AI Career Mentor API")
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-app.include_router(quiz_router)
-app.include_router(summarize_router)
-app.include_router(ask_router)
-
-
-
-class ChatRequest(BaseModel):
-    message: str
-    user_id: str | None = None
-
-class ChatResponse(BaseModel):
-    reply: str
-
-class TTSRequest(BaseModel):
-    text: str
-
-@app.post("/careerapi/chat", response_model=ChatResponse)
-async def career_chat(req: ChatRequest):
-    if not req.message.strip():
-        raise HTTPException(status_code=400, detail="Message cannot be empty")
-
-    agent = create_career_mentor()
-    try:
-        logger.info(f"Career chat: {req.message[:100]}")
-        result = await Runner.run(agent, req.message, run_config=config)
-        reply = result.final_output or "I'm your AI Career Mentor! How can I help you today?"
-        return ChatResponse(reply=reply)
-    except Exception as e:
-        logger.error(f"Agent error: {e}")
-        raise HTTPException(status_code=500, detail="Mentor is busy. Try again!")
-
-@app.post("/careerapi/upload-cv")
-async def upload_cv(file: UploadFile = File(...)):
-    content = await file.read()
-    text = content.decode("utf-8", errors="ignore")
-    if len(text.strip()) < 50:
-        raise HTTPException(status_code=400, detail="CV too short")
-
-    agent = create_career_mentor()
-    prompt = f"Analyze this CV and give detailed feedback:\n\n{text[:30000]}"
-    result = await Runner.run(agent, prompt, run_config=config)
-    return {"analysis": result.final_output}
-
-@app.post("/careerapi/tts")
-async def tts(req: TTSRequest):
-    audio_bytes = text_to_speech_bytes(req.text)
-    return StreamingResponse(
-        io.BytesIO(audio_bytes),
-        media_type="audio/mpeg",
-        headers={"Content-Disposition": "attachment; filename=career-advice.mp3"}
+def create_app() -> FastAPI:
+    """
+    Build the API. Settings (and .env) are loaded once, before the routers
+    are imported, since they read their own options at import time. The
+    agents and OpenAI SDKs are only imported by the first model call, or in
+    the background at startup when WARMUP_ON_START=1, which then also refills
+    the popular quiz topics.
+    """
+    settings = get_settings()
+    if not settings.gemini_api_key:
+        logger.warning("GEMINI_API_KEY not set; model calls will fail")
+
+    from quiz import router as quiz_router, quiz_pool
+    from summarize import router as summarize_router
+    from ask import router as ask_router, ledger
+    from career import router as career_router, sessions
+    from jobs import router as jobs_router, job_manager
+
+    from utils.workers import shutdown_process_pool
+    from utils.extract import UploadLimitMiddleware
+    from utils.llm import close_client
+    from utils.metrics import CONTENT_TYPE, METRICS_ENABLED, MetricsMiddleware, monitor_loop_lag, render
+    from utils.tokens import load_encoder
+    from utils.warmup import warm_up
+
+    async def warm_start():
+        # Quiz refills call the model, so they wait for the SDK imports.
+        await asyncio.to_thread(warm_up)
+        quiz_pool.warm()
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        background = [asyncio.create_task(asyncio.to_thread(load_encoder))]
+        quiz_pool.load_popularity()
+        if settings.warmup:
+            background.append(asyncio.create_task(warm_start()))
+        job_manager.start()
+        if METRICS_ENABLED:
+            background.append(asyncio.create_task(monitor_loop_lag()))
+        yield
+        for task in background:
+            task.cancel()
+        await job_manager.close()
+        await quiz_pool.close()
+        sessions.close()
+        shutdown_process_pool()
+        ledger.close()
+        await close_client()
+
+    app = FastAPI(title="UAARN + AI Career Mentor API", lifespan=lifespan)
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=list(settings.cors_origins),
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
     )
 
-@app.post("/careerapi/download/txt")
-async def download_txt(req: TTSRequest):
-    return StreamingResponse(
-        io.BytesIO(req.text.encode('utf-8')),
-        media_type="text/plain",
-        headers={"Content-Disposition": "attachment; filename=career-roadmap.txt"}
-    )
+    app.add_middleware(UploadLimitMiddleware)
 
-@app.post("/careerapi/download/pdf")
-async def download_pdf(req: TTSRequest):
-    pdf_bytes = text_to_pdf_bytes(req.text)
-    return StreamingResponse(
-        io.BytesIO(pdf_bytes),
-        media_type="application/pdf",
-        headers={"Content-Disposition": "attachment; filename=career-roadmap.pdf"}
-    )
+    # Outermost, so it times everything including the middleware above.
+    app.add_middleware(MetricsMiddleware)
+
+    app.include_router(quiz_router)
+    app.include_router(summarize_router)
+    app.include_router(ask_router)
+    app.include_router(career_router)
+    app.include_router(jobs_router)
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        return Response(render(), media_type=CONTENT_TYPE)
+
+    @app.get("/")
+    def root():
+        return {"message": "UAARN Backend Running"}
 
+    return app
 
-@app.get("/")
-def root():
-    return {"message": "UAARN Backend Running"}
\ No newline at end of file
+app = create_app()
@@ -1,131 +1,160 @@
 import os
-import json
-from fastapi import APIRouter, FastAPI, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from dotenv import load_dotenv
+import asyncio
+from functools import lru_cache
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field, ValidationError
 
-from agents import Agent, Runner, OpenAIChatCompletionsModel, AsyncOpenAI
-from agents import RunConfig
+from utils.runner import run_agent
+from utils.scheduler import ANALYSIS, scheduler
+from utils.llm import get_run_config
+from utils.quiz_pool import QuizPool, normalize_topic
+from utils.json_stream import JSONArrayItemParser
+from utils.streaming import sse_event, sse_response, stream_text_deltas
 
-load_dotenv()
+QUIZ_BATCH_CONCURRENCY = int(os.getenv("QUIZ_BATCH_CONCURRENCY", "4"))
+QUIZ_BATCH_MAX_ITEMS = int(os.getenv("QUIZ_BATCH_MAX_ITEMS", "100"))
 
-gemini_api_key = os.getenv("GEMINI_API_KEY")
-if not gemini_api_key:
-    raise RuntimeError("⚠ GEMINI_API_KEY not set in .env file")
-
-external_client = AsyncOpenAI(
-    api_key=gemini_api_key,
-    base_url="https://generativelanguage.googleapis.com/v1beta/openai/",
-)
-
-model = OpenAIChatCompletionsModel(
-    model="gemini-2.0-flash",
-    openai_client=external_client
-)
-
-config = RunConfig(
-    model=model,
-    model_provider=external_client,
-    tracing_disabled=True
-)
+router = APIRouter(prefix="/quiz", tags=["Quiz"])
 
-app = FastAPI()
+class QuizRequest(BaseModel):
+    topic: str
+    count: int = Field(5, ge=1, le=50)
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+class QuizBatchRequest(BaseModel):
+    items: list[QuizRequest] = Field(..., min_length=1, max_length=QUIZ_BATCH_MAX_ITEMS)
+    concurrency: int | None = Field(None, ge=1)
 
+class QuizQuestion(BaseModel):
+    question: str
+    options: list[str]
+    answer: str
+    explanation: str
 
-router = APIRouter(prefix="/quiz", tags=["Quiz"])
+class QuizOutput(BaseModel):
+    questions: list[QuizQuestion]
 
-class QuizRequest(BaseModel):
-    topic: str
+@lru_cache(maxsize=None)
+def get_quiz_agent():
+    from agents import Agent
 
-quiz_agent = Agent(
-    name="quiz_agent",
-    instructions="""
+    return Agent(
+        name="quiz_agent",
+        instructions="""
 You are a Quiz Generator Agent.
-- If user says "20 quiz", generate exactly 20 quiz questions.
-- If user says "10 quiz", generate 10.
-- If user says "3 quiz", generate 3.
-- Default = 10 quizzes if user doesn't specify number.
-Always respond in pure JSON format. 
-add short explanations.
-
-
-JSON FORMAT:
-[
-  {
-    "question": "...",
-    "options": ["A", "B", "C", "D"],
-    "answer": "Correct option here"
-  }
-]
-
-Rules:
-- Only output JSON
-- No markdown, no text before/after JSON
-- Make sure JSON is valid
+- Generate exactly the number of quiz questions the user asks for.
+- Each question has 4 options.
+- "answer" must be the full text of the correct option.
+- Add a short explanation for every answer.
 """,
-)
+        output_type=QuizOutput,
+    )
 
-def extract_json_from_text(text: str):
-    text = text.strip()
-    if text.startswith("{") or text.startswith("["):
-        try:
-            return json.loads(text)
-        except Exception:
-            pass
-
-    start = text.find("[")
-    end = text.rfind("]")
-    if start != -1 and end != -1 and end > start:
-        candidate = text[start:end+1]
-        try:
-            return json.loads(candidate)
-        except Exception:
-            pass
-
-    start = text.find("{")
-    end = text.rfind("}")
-    if start != -1 and end != -1 and end > start:
-        candidate = text[start:end+1]
-        try:
-            return json.loads(candidate)
-        except Exception:
-            pass
+def quiz_prompt(topic: str, count: int) -> str:
+    return f"Generate {count} quiz questions about {topic}."
+
+async def generate_questions(topic: str, count: int) -> list:
+    result = await run_agent(get_quiz_agent(), quiz_prompt(topic, count), run_config=get_run_config("quiz"), priority=ANALYSIS)
+    return [q.model_dump() for q in result.final_output.questions]
+
+quiz_pool = QuizPool(generate_questions)
 
-    raise ValueError("No valid JSON found in AI output.")
 @router.post("/")
 async def generate_quiz(request: QuizRequest):
     if not request.topic or not request.topic.strip():
         raise HTTPException(status_code=400, detail="Topic is required")
 
-    prompt = f"Generate 5 quiz questions about {request.topic}."
+    from agents.exceptions import ModelBehaviorError
 
     try:
-        runner = Runner()
-        result = await runner.run(
-            starting_agent=quiz_agent,
-            input=prompt,
-            run_config=config
-        )
+        return {"quiz": await quiz_pool.get(request.topic, request.count)}
+
+    except ModelBehaviorError as e:
+        raise HTTPException(status_code=500, detail=f"AI parse error: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
 
-        text_output = result.output_text if hasattr(result, "output_text") else str(result)
+@router.post("/stream")
+async def stream_quiz(request: QuizRequest):
+    """
+    Stream questions as server-sent events, one `question` event per
+    question as soon as it is complete, then a `done` event.
+    """
+    if not request.topic or not request.topic.strip():
+        raise HTTPException(status_code=400, detail="Topic is required")
 
-        parsed = extract_json_from_text(text_output)
+    key = normalize_topic(request.topic)
+    quiz_pool.touch(key)
+    pooled = quiz_pool.sample(key, request.count)
+    if pooled is not None:
+        quiz_pool.maybe_refill(key, request.topic, request.count)
 
-        if not isinstance(parsed, list):
-            raise ValueError("Parsed JSON is not a list")
+    async def events():
+        from agents import Runner
 
-        return {"quiz": parsed}
+        if pooled is not None:
+            for index, question in enumerate(pooled):
+                yield sse_event({"index": index, "question": question}, event="question")
+            yield sse_event({"count": len(pooled)}, event="done")
+            return
 
-    except ValueError as ve:
-        raise HTTPException(status_code=500, detail=f"AI parse error: {str(ve)}")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
+        questions = []
+        parser = JSONArrayItemParser()
+        try:
+            async with scheduler.slot(ANALYSIS):
+                result = Runner.run_streamed(get_quiz_agent(), quiz_prompt(request.topic, request.count), run_config=get_run_config("quiz"))
+                async for delta in stream_text_deltas(result):
+                    for item in parser.feed(delta):
+                        try:
+                            question = QuizQuestion.model_validate(item).model_dump()
+                        except ValidationError:
+                            continue
+                        yield sse_event({"index": len(questions), "question": question}, event="question")
+                        questions.append(question)
+        except Exception as e:
+            yield sse_event({"detail": f"Internal error: {str(e)}"}, event="error")
+            return
+        finally:
+            if questions:
+                quiz_pool.add(key, questions)
+
+        yield sse_event({"count": len(questions)}, event="done")
+
+    return sse_response(events())
+
+@router.post("/batch")
+async def batch_quiz(request: QuizBatchRequest):
+    """
+    Generate quizzes for many topics concurrently (at most
+    QUIZ_BATCH_CONCURRENCY at a time). Each topic is streamed back as a
+    `result` or `error` event as soon as it finishes, then a `done` event.
+    """
+    concurrency = min(request.concurrency or QUIZ_BATCH_CONCURRENCY, QUIZ_BATCH_CONCURRENCY)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_item(index: int, item: QuizRequest):
+        if not item.topic.strip():
+            return index, item, None, "Topic is required"
+        try:
+            async with semaphore:
+                return index, item, await quiz_pool.get(item.topic, item.count), None
+        except Exception as e:
+            return index, item, None, str(e)
+
+    async def events():
+        tasks = [asyncio.create_task(run_item(i, item)) for i, item in enumerate(request.items)]
+        failed = 0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                index, item, quiz, error = await next_done
+                if error is None:
+                    yield sse_event({"index": index, "topic": item.topic, "quiz": quiz}, event="result")
+                else:
+                    failed += 1
+                    yield sse_event({"index": index, "topic": item.topic, "detail": error}, event="error")
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        yield sse_event({"succeeded": len(tasks) - failed, "failed": failed}, event="done")
+
+    return sse_response(events())
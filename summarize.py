@@ -1,54 +1,39 @@
-import os
 import io
-from fastapi import APIRouter, FastAPI, UploadFile, File, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
+import os
+import asyncio
+import logging
+from fastapi import APIRouter, UploadFile, File, HTTPException, Request
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
-from dotenv import load_dotenv
-from langdetect import detect
-from gtts import gTTS
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from agents import Agent, Runner, OpenAIChatCompletionsModel, AsyncOpenAI
-from agents import RunConfig
-
-router = APIRouter(prefix="/summarize", tags=["Summarize"])
-
-
+from jobs import job_manager, submit_job
+from utils.runner import run_agent
+from utils.scheduler import BULK
+from utils.llm import get_run_config
+from utils.artifacts import artifact_key, cached_json, json_response, not_modified
+from utils.tts import speech_response
+from utils.export import export_response
+from utils.tokens import split_by_tokens, truncate_tokens
+from utils.language import detect_language
+from utils.extract import extract_upload
+from utils.youtube import extract_video_id, format_transcript, get_transcript_async
 
-load_dotenv()
+logger = logging.getLogger(__name__)
 
-gemini_api_key = os.getenv("GEMINI_API_KEY")
-if not gemini_api_key:
-    raise RuntimeError("⚠ GEMINI_API_KEY not set in .env file")
-
-
-external_client = AsyncOpenAI(
-    api_key=gemini_api_key,
-    base_url="https://generativelanguage.googleapis.com/v1beta/openai/",
-)
-
-
-model = OpenAIChatCompletionsModel(
-    model="gemini-2.0-flash",
-    openai_client=external_client
-)
+router = APIRouter(prefix="/summarize", tags=["Summarize"])
 
-config = RunConfig(
-    model=model,
-    model_provider=external_client,
-    tracing_disabled=True
-)
 
-app = FastAPI()
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Texts longer than SUMMARY_CHUNK_TOKENS are summarized map-reduce style.
+SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "10000"))
+SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", "4"))
+# Upper bound on text taken from an uploaded file.
+UPLOAD_MAX_TOKENS = int(os.getenv("UPLOAD_MAX_TOKENS", "250000"))
+# Same bound for pasted text and transcripts, and at most this many
+# map-reduce chunks per summary.
+SUMMARY_MAX_TOKENS = int(os.getenv("SUMMARY_MAX_TOKENS", str(UPLOAD_MAX_TOKENS)))
+SUMMARY_MAX_CHUNKS = int(os.getenv("SUMMARY_MAX_CHUNKS", "25"))
+TRANSLATE_CHUNK_TOKENS = int(os.getenv("TRANSLATE_CHUNK_TOKENS", "2000"))
+TRANSLATE_CONCURRENCY = int(os.getenv("TRANSLATE_CONCURRENCY", "4"))
 
 class SummarizeRequest(BaseModel):
     source: str
@@ -60,12 +45,14 @@ class TTSRequest(BaseModel):
 
 
 def create_agent():
+    from agents import Agent
+
     return Agent(
         name="Summarizer Agent",
         instructions="""
         You are a smart summarization assistant.
         Summarize clearly and concisely.
-        If YouTube link is provided, summarize content.
+        If a YouTube transcript is provided, summarize its content.
         If raw text or transcript is provided, give structured summary.
         Return result in markdown format:
         📌 Short Summary: ...
@@ -77,55 +64,161 @@ def create_agent():
         """
     )
 
-async def translate_to_english(text: str) -> str:
-    try:
-        detected_lang = detect(text)
-        if detected_lang.lower() == "en":
-            return text
-        translation_prompt = f"Translate this text from {detected_lang} to English:\n\n{text[:40000]}"
-        translation_agent = Agent(name="Translation Agent", instructions="Translate text accurately to English.")
-        result = await Runner.run(translation_agent, translation_prompt, run_config=config)
+def create_chunk_agent():
+    from agents import Agent
+
+    return Agent(
+        name="Chunk Summarizer Agent",
+        instructions="""
+        You summarize one part of a longer transcript.
+        Return concise markdown bullet points covering every key point in this part.
+        Keep any timestamps or notable highlights you see.
+        Do not add an introduction or conclusion.
+        """
+    )
+
+async def summarize_text(text: str, instruction: str) -> str:
+    """
+    Summarize text in one call, or map-reduce it when it exceeds
+    SUMMARY_CHUNK_TOKENS: chunks are summarized concurrently (at most
+    SUMMARY_CONCURRENCY at a time) and the partial summaries are merged
+    into the final markdown summary.
+    """
+    chunks = await asyncio.to_thread(split_by_tokens, text, SUMMARY_CHUNK_TOKENS)
+    if len(chunks) > SUMMARY_MAX_CHUNKS:
+        logger.warning(f"Summarizing the first {SUMMARY_MAX_CHUNKS} of {len(chunks)} chunks")
+        chunks = chunks[:SUMMARY_MAX_CHUNKS]
+    if len(chunks) <= 1:
+        result = await run_agent(create_agent(), f"{instruction}\n{text}", run_config=get_run_config("summarize"), priority=BULK)
         return result.final_output
-    except Exception as e:
-        print(f"⚠ Translation error: {e}")
+
+    semaphore = asyncio.Semaphore(SUMMARY_CONCURRENCY)
+    chunk_agent = create_chunk_agent()
+
+    async def summarize_chunk(index: int, chunk: str) -> str:
+        async with semaphore:
+            prompt = f"Part {index} of {len(chunks)}:\n{chunk}"
+            result = await run_agent(chunk_agent, prompt, run_config=get_run_config("summarize"), priority=BULK)
+            return result.final_output
+
+    partials = await asyncio.gather(
+        *(summarize_chunk(i, chunk) for i, chunk in enumerate(chunks, start=1))
+    )
+    merged = "\n\n".join(f"Part {i}:\n{partial}" for i, partial in enumerate(partials, start=1))
+    prompt = (
+        f"{instruction}\n"
+        "The transcript was too long to read at once, so here are summaries of its "
+        "consecutive parts. Combine them into one summary of the whole transcript.\n\n"
+        f"{merged}"
+    )
+    result = await run_agent(create_agent(), prompt, run_config=get_run_config("summarize"), priority=BULK)
+    return result.final_output
+
+async def translate_to_english(text: str) -> str:
+    """
+    Detect the language of each chunk and translate the non-English ones
+    concurrently. English chunks are passed through untouched and the result
+    is reassembled in the original order.
+    """
+    chunks = await asyncio.to_thread(split_by_tokens, text, TRANSLATE_CHUNK_TOKENS)
+    languages = await asyncio.to_thread(lambda: [detect_language(chunk) for chunk in chunks])
+    if all(lang in ("en", None) for lang in languages):
         return text
 
-@router.post("/api/agent/summarize")
-async def summarize(req: SummarizeRequest):
-    agent = create_agent()
+    semaphore = asyncio.Semaphore(TRANSLATE_CONCURRENCY)
+    from agents import Agent
+
+    translation_agent = Agent(name="Translation Agent", instructions="Translate text accurately to English.")
+
+    async def translate_chunk(chunk: str, lang: str | None) -> str:
+        if lang in ("en", None):
+            return chunk
+        try:
+            async with semaphore:
+                translation_prompt = f"Translate this text from {lang} to English:\n\n{chunk}"
+                result = await run_agent(translation_agent, translation_prompt, run_config=get_run_config("translate"), priority=BULK)
+                return result.final_output
+        except Exception as e:
+            logger.warning(f"Translation error: {e}")
+            return chunk
+
+    translated = await asyncio.gather(
+        *(translate_chunk(chunk, lang) for chunk, lang in zip(chunks, languages))
+    )
+    return "\n\n".join(translated)
 
+async def summarize_source(payload: dict) -> dict:
+    req = SummarizeRequest(**payload)
     if req.source == "youtube" and req.link:
-        user_prompt = f"Summarize this YouTube video:\n{req.link}"
+        video_id = extract_video_id(req.link)
+        if not video_id:
+            raise HTTPException(status_code=400, detail="Invalid YouTube link")
+        try:
+            snippets = await get_transcript_async(video_id)
+        except Exception as e:
+            logger.warning(f"Transcript error for {video_id}: {e}")
+            raise HTTPException(status_code=404, detail="No transcript available for this video")
+        transcript = format_transcript(snippets)
+        if not transcript:
+            raise HTTPException(status_code=404, detail="No transcript available for this video")
+        transcript = await asyncio.to_thread(truncate_tokens, transcript, SUMMARY_MAX_TOKENS)
+        translated_text = await translate_to_english(transcript)
+        output = await summarize_text(
+            translated_text,
+            "Summarize the following YouTube video transcript. Each line starts with its "
+            "[mm:ss] timestamp; use these in the Timestamps or Highlights section:",
+        )
+        return {"output": output}
     elif req.source == "text" and req.text:
-        translated_text = await translate_to_english(req.text)
-        user_prompt = f"Summarize the following transcript:\n{translated_text[:40000]}"
+        text = await asyncio.to_thread(truncate_tokens, req.text, SUMMARY_MAX_TOKENS)
+        translated_text = await translate_to_english(text)
+        output = await summarize_text(translated_text, "Summarize the following transcript:")
+        return {"output": output}
     else:
         raise HTTPException(status_code=400, detail="Missing input")
 
-    result = await Runner.run(agent, user_prompt, run_config=config)
-    return {"output": result.final_output}
+async def summarize_file(payload: dict) -> dict:
+    async def summarize():
+        translated_text = await translate_to_english(payload["text"])
+        output = await summarize_text(translated_text, "Summarize the following transcript from file:")
+        return {"output": output}
 
-@router.post("/api/agent/upload")
-async def upload_file(file: UploadFile = File(...)):
-    content = (await file.read()).decode("utf-8", errors="ignore")
-    if not content:
+    return await cached_json(artifact_key("summarize_file", payload["text"]), summarize)
+
+job_manager.register("summarize", summarize_source)
+job_manager.register("summarize_file", summarize_file)
+
+async def read_upload(file: UploadFile) -> str:
+    content = await extract_upload(file, max_tokens=UPLOAD_MAX_TOKENS)
+    if not content.strip():
         raise HTTPException(status_code=400, detail="Empty file")
-    translated_text = await translate_to_english(content)
-    agent = create_agent()
-    user_prompt = f"Summarize the following transcript from file:\n{translated_text[:40000]}"
-    result = await Runner.run(agent, user_prompt, run_config=config)
-    return {"output": result.final_output}
+    return content
+
+@router.post("/api/agent/summarize")
+async def summarize(req: SummarizeRequest):
+    return await summarize_source(req.model_dump())
+
+@router.post("/api/agent/summarize/jobs", status_code=202)
+async def summarize_job(req: SummarizeRequest):
+    """Queue the summary and return a job ID; follow it at /jobs/{id}."""
+    if not ((req.source == "youtube" and req.link) or (req.source == "text" and req.text)):
+        raise HTTPException(status_code=400, detail="Missing input")
+    return submit_job("summarize", req.model_dump())
+
+@router.post("/api/agent/upload")
+async def upload_file(request: Request, file: UploadFile = File(...)):
+    text = await read_upload(file)
+    key = artifact_key("summarize_file", text)
+    return not_modified(request, key) or json_response(await summarize_file({"text": text}), key)
+
+@router.post("/api/agent/upload/jobs", status_code=202)
+async def upload_file_job(file: UploadFile = File(...)):
+    """Queue the file summary and return a job ID; follow it at /jobs/{id}."""
+    return submit_job("summarize_file", {"text": await read_upload(file)})
 
 @router.post("/api/agent/tts")
-async def text_to_speech(req: TTSRequest):
-    try:
-        tts = gTTS(text=req.text, lang='en')
-        mp3_fp = io.BytesIO()
-        tts.write_to_fp(mp3_fp)
-        mp3_fp.seek(0)
-        return StreamingResponse(mp3_fp, media_type="audio/mpeg")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"TTS failed: {e}")
+async def text_to_speech(req: TTSRequest, request: Request):
+    return await speech_response(req.text, request=request)
 
 
 @router.post("/api/agent/download/txt")
@@ -139,19 +232,10 @@ async def download_txt(req: TTSRequest):
 
 
 @router.post("/api/agent/download/pdf")
-async def download_pdf(req: TTSRequest):
-    buffer = io.BytesIO()
-    p = canvas.Canvas(buffer, pagesize=letter)
-    textobject = p.beginText(40, 750)
-    for line in req.text.splitlines():
-        textobject.textLine(line)
-    p.drawText(textobject)
-    p.showPage()
-    p.save()
-    buffer.seek(0)
-    return StreamingResponse(
-        buffer,
-        media_type="application/pdf",
-        headers={"Content-Disposition": "attachment; filename=summary.pdf"}
-)
+async def download_pdf(req: TTSRequest, request: Request):
+    return await export_response(req.text, "pdf", "summary", request)
+
 
+@router.post("/api/agent/download/docx")
+async def download_docx(req: TTSRequest, request: Request):
+    return await export_response(req.text, "docx", "summary", request)
@@ -0,0 +1,47 @@
+import pytest
+
+from utils.answer_cache import AnswerCache
+
+
+def cache_with(question: str, **kwargs) -> AnswerCache:
+    cache = AnswerCache(**kwargs)
+    cache.put(question, "stored answer")
+    return cache
+
+
+@pytest.mark.parametrize("stored, asked", [
+    ("What are Newton's laws of motion?", "Explain Newton's laws of motion"),
+    ("What are Newton's laws of motion?", "can you explain newtons laws of motion in simple words"),
+    ("Explain the water cycle in detail for my exam", "Explain the water cycle for my exam"),
+])
+def test_rephrased_question_hits(stored, asked):
+    assert cache_with(stored).get(asked) == "stored answer"
+
+
+@pytest.mark.parametrize("stored, asked", [
+    ("advantages of solar energy", "disadvantages of solar energy"),
+    ("define a prokaryotic cell", "define a eukaryotic cell"),
+    ("causes of world war I", "causes of world war II"),
+    ("causes of world war II", "causes of world war"),
+    ("solve 2x+3=7", "solve 2x+5=7"),
+])
+def test_different_question_misses(stored, asked):
+    cache = cache_with(stored)
+    assert cache.get(asked) is None
+    assert cache.get(stored) == "stored answer"
+
+
+def test_expired_entry_is_dropped():
+    cache = cache_with("What is osmosis?", ttl=-1)
+    assert cache.get("What is osmosis?") is None
+    assert len(cache) == 0
+
+
+def test_oldest_entry_is_evicted():
+    cache = AnswerCache(max_entries=2)
+    cache.put("What is osmosis?", "a")
+    cache.put("What is diffusion?", "b")
+    cache.get("What is osmosis?")
+    cache.put("What is photosynthesis?", "c")
+    assert cache.get("What is diffusion?") is None
+    assert cache.get("What is osmosis?") == "a"
@@ -0,0 +1,44 @@
+import asyncio
+import os
+import time
+
+from utils import jobs
+from utils.jobs import JobManager, JobStore
+
+
+def stale_job(store: JobStore, owner, age: float) -> str:
+    job, _ = store.create("echo", "key", {"n": 1})
+    store.set_running(job["id"])
+    store._conn.execute(
+        "UPDATE jobs SET owner = ?, updated = ? WHERE id = ?", (owner, time.time() - age, job["id"])
+    )
+    return job["id"]
+
+
+def test_job_of_dead_process_with_reused_pid_is_reclaimed(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    store = JobStore(path)
+    job_id = stale_job(store, os.getpid(), age=120)
+
+    async def scenario():
+        manager = JobManager(path, workers=1, lease=60)
+
+        async def echo(payload):
+            return payload["n"]
+
+        manager.register("echo", echo)
+        manager.start()
+        job = await manager.wait(job_id, 5)
+        while job["status"] not in jobs.FINISHED:
+            job = await manager.wait(job_id, 5)
+        await manager.close()
+        return job
+
+    assert asyncio.run(scenario())["result"] == 1
+
+
+def test_job_with_live_lease_is_left_alone(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    stale_job(store, "other-worker", age=5)
+    assert store.claim_orphans(lease=60) == []
+    assert len(store.claim_orphans(lease=1)) == 1
@@ -0,0 +1,48 @@
+import asyncio
+import itertools
+
+from utils.quiz_pool import QuizPool
+
+_ids = itertools.count()
+
+
+async def generate(topic: str, count: int) -> list[dict]:
+    return [{"question": f"{topic} question {next(_ids)}", "options": ["a", "b"]} for _ in range(count)]
+
+
+def test_popularity_stays_bounded():
+    pool = QuizPool(generate, max_topics=10)
+    pool.touch("hot")
+    pool.touch("hot")
+    for i in range(1000):
+        pool.touch(f"topic {i}")
+    assert len(pool.popularity) <= 20
+    assert "hot" in pool.popularity
+
+
+def test_hot_pool_rotates_after_serving():
+    async def scenario():
+        pool = QuizPool(generate, max_size=30, low=5, batch=10, refresh_served=20)
+        first = {q["question"] for q in await pool.get("physics", 5)}
+        await asyncio.sleep(0)
+        original = {q["question"] for q in pool.pools["physics"]}
+        for _ in range(10):
+            await pool.get("physics", 5)
+            await asyncio.sleep(0)
+        current = {q["question"] for q in pool.pools["physics"]}
+        return first, original, current
+
+    first, original, current = asyncio.run(scenario())
+    assert first <= original
+    assert current - original
+    assert len(current) == 30
+
+
+def test_old_pool_is_refreshed():
+    async def scenario():
+        pool = QuizPool(generate, low=5, batch=10, max_age=-1)
+        await pool.get("biology", 5)
+        await asyncio.sleep(0)
+        return len(pool.pools["biology"])
+
+    assert asyncio.run(scenario()) == 20
@@ -0,0 +1,68 @@
+import asyncio
+import threading
+
+import pytest
+import tiktoken
+
+from utils import tokens
+
+
+class FakeEncoder:
+    def encode(self, text, disallowed_special=()):
+        return text.split()
+
+
+@pytest.fixture
+def loader(monkeypatch):
+    """Fresh encoder state and a tiktoken.get_encoding that fails until `ok` is set."""
+    monkeypatch.setattr(tokens, "_encoder", None)
+    monkeypatch.setattr(tokens, "_failures", 0)
+    monkeypatch.setattr(tokens, "_retry_at", 0.0)
+    monkeypatch.setattr(tokens, "_background_load", None)
+    state = {"ok": False, "threads": [], "gate": threading.Event()}
+    state["gate"].set()
+
+    def get_encoding(name):
+        state["threads"].append(threading.current_thread())
+        state["gate"].wait(5)
+        if not state["ok"]:
+            raise OSError("network down")
+        return FakeEncoder()
+
+    monkeypatch.setattr(tiktoken, "get_encoding", get_encoding)
+    return state
+
+
+def test_failed_load_is_retried_after_backoff(loader):
+    assert tokens.load_encoder() is None
+    loader["ok"] = True
+    assert tokens.load_encoder() is None
+    assert len(loader["threads"]) == 1
+
+    tokens._retry_at = 0.0
+    assert isinstance(tokens.load_encoder(), FakeEncoder)
+    assert tokens.count_tokens("three short words") == 3
+
+
+def test_backoff_grows(loader):
+    tokens.load_encoder()
+    first = tokens._retry_at
+    tokens._retry_at = 0.0
+    tokens.load_encoder()
+    assert tokens._retry_at - first > tokens.ENCODER_RETRY_MIN / 2
+
+
+def test_event_loop_never_loads_inline(loader):
+    loader["ok"] = True
+    loader["gate"].clear()
+
+    async def on_loop():
+        return tokens.get_encoder(), tokens.count_tokens("three short words")
+
+    encoder, count = asyncio.run(on_loop())
+    assert encoder is None
+    assert count == 5  # approximated while the encoder loads
+    loader["gate"].set()
+    tokens._background_load.join(5)
+    assert threading.main_thread() not in loader["threads"]
+    assert isinstance(tokens.get_encoder(), FakeEncoder)
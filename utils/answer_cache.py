@@ -0,0 +1,189 @@
+import os
+import random
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "1") == "1"
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.85"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", str(24 * 3600)))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "10000"))
+ANSWER_CACHE_MAX_BYTES = int(os.getenv("ANSWER_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+_PRIME = (1 << 61) - 1
+_MASK = (1 << 64) - 1
+
+_rng = random.Random(1)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+STOP_WORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "be", "of", "to", "in", "on",
+    "for", "and", "or", "me", "my", "i", "you", "your", "please", "can", "could",
+    "would", "tell", "explain", "describe", "what", "whats", "about", "do", "does",
+    "give", "some", "with", "briefly", "detail", "details", "simple", "words",
+}
+
+_NON_WORD = re.compile(r"[^\w\s]+")
+_ROMAN = re.compile(r"x{0,3}(?:ix|iv|v?i{0,3})")
+
+
+def normalize_question(text: str) -> list[str]:
+    """
+    Lowercase words with punctuation, stop words and plural/possessive endings
+    removed. A final capital "I" after another word ("world war I") is kept
+    as a numeral rather than dropped as the pronoun.
+    """
+    words = []
+    tokens = _NON_WORD.sub(" ", text.replace("'s", "").replace("'S", "")).split()
+    for index, token in enumerate(tokens):
+        word = token.lower()
+        if word in STOP_WORDS and not (token == "I" and 0 < index == len(tokens) - 1):
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.append(word)
+    return words
+
+
+def _is_numeral(word: str) -> bool:
+    if any(c.isdigit() for c in word):
+        return True
+    return (len(word) > 1 or word == "i") and _ROMAN.fullmatch(word) is not None
+
+
+def _numbers(words: list[str]) -> frozenset[str]:
+    return frozenset(w for w in words if _is_numeral(w))
+
+
+def minhash(items: set[str]) -> tuple[int, ...]:
+    hashes = [hash(item) & _MASK for item in items]
+    return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS)
+
+
+def _bands(signature: tuple[int, ...]):
+    for band in range(BANDS):
+        yield band, signature[band * ROWS:(band + 1) * ROWS]
+
+
+@dataclass
+class _Entry:
+    answer: str
+    words: set[str]
+    signature: tuple[int, ...]
+    numbers: frozenset[str]
+    created: float = field(default_factory=time.monotonic)
+    size: int = 0
+
+
+class AnswerCache:
+    """
+    Near-duplicate question -> answer cache.
+    Questions are normalized to their content words; MinHash/LSH finds
+    candidate entries and the best candidate is accepted if its word-level
+    Jaccard similarity is at least `threshold` and it has the same numbers.
+    Words, not character n-grams, are compared: "advantages" and
+    "disadvantages" share most of their n-grams. Entries are evicted LRU,
+    by TTL, and to stay under `max_entries` / `max_bytes`.
+    """
+
+    def __init__(
+        self,
+        threshold: float = ANSWER_CACHE_THRESHOLD,
+        ttl: float = ANSWER_CACHE_TTL,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+        max_bytes: int = ANSWER_CACHE_MAX_BYTES,
+    ):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._buckets: dict[tuple, set[str]] = {}
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, words: list[str]) -> str:
+        return " ".join(words)
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= entry.size
+        for band in _bands(entry.signature):
+            bucket = self._buckets.get(band)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band]
+
+    def _expired(self, entry: _Entry) -> bool:
+        return time.monotonic() - entry.created > self.ttl
+
+    def get(self, question: str) -> str | None:
+        words = normalize_question(question)
+        if not words:
+            return None
+        key = self._key(words)
+
+        entry = self._entries.get(key)
+        if entry is None:
+            items = set(words)
+            numbers = _numbers(words)
+            candidates = set()
+            for band in _bands(minhash(items)):
+                candidates |= self._buckets.get(band, set())
+            best, best_score = None, 0.0
+            for candidate in candidates:
+                other_entry = self._entries[candidate]
+                # "2x+3=7" and "2x+5=7", or "world war I" and "world war II",
+                # look alike but need different answers.
+                if numbers != other_entry.numbers:
+                    continue
+                other = other_entry.words
+                score = len(items & other) / len(items | other)
+                if score > best_score:
+                    best, best_score = candidate, score
+            if best is not None and best_score >= self.threshold:
+                key, entry = best, self._entries[best]
+
+        if entry is None or self._expired(entry):
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.answer
+
+    def put(self, question: str, answer: str):
+        words = normalize_question(question)
+        if not words:
+            return
+        key = self._key(words)
+        self._remove(key)
+
+        items = set(words)
+        entry = _Entry(answer=answer, words=items, signature=minhash(items), numbers=_numbers(words))
+        entry.size = len(answer.encode("utf-8")) + sum(len(s) for s in items) + len(key)
+        if entry.size > self.max_bytes:
+            return
+
+        self._entries[key] = entry
+        self._bytes += entry.size
+        for band in _bands(entry.signature):
+            self._buckets.setdefault(band, set()).add(key)
+
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            self._remove(next(iter(self._entries)))
+
+    def __len__(self) -> int:
+        return len(self._entries)
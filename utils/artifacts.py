@@ -0,0 +1,260 @@
+import asyncio
+import hashlib
+import json
+import logging
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import AsyncIterator, Awaitable, Callable
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+from utils.metrics import cache_lookup
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_CACHE_ENABLED = os.getenv("ARTIFACT_CACHE_ENABLED", "1") == "1"
+ARTIFACT_DIR = os.getenv("ARTIFACT_DIR", os.path.join(".cache", "artifacts"))
+ARTIFACT_MEMORY_BYTES = int(os.getenv("ARTIFACT_MEMORY_BYTES", str(32 * 1024 * 1024)))
+ARTIFACT_DISK_BYTES = int(os.getenv("ARTIFACT_DISK_BYTES", str(1024 * 1024 * 1024)))
+# Blobs at least this large skip the memory tier and are memory-mapped on read.
+ARTIFACT_MMAP_BYTES = int(os.getenv("ARTIFACT_MMAP_BYTES", str(256 * 1024)))
+ARTIFACT_CHUNK_BYTES = 64 * 1024
+
+Blob = bytes | mmap.mmap
+
+
+def artifact_key(op: str, data: str | bytes, **params) -> str:
+    """Hash of (operation, input, parameters) naming an artifact."""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    digest = hashlib.sha256()
+    digest.update(op.encode("utf-8") + b"\x1f")
+    digest.update(json.dumps(params, sort_keys=True).encode("utf-8") + b"\x1f")
+    digest.update(data)
+    return digest.hexdigest()
+
+
+class ArtifactStore:
+    """
+    Content-addressed blobs in two size-bounded LRU tiers: memory for small
+    blobs, and a directory shared by all workers on the host. Disk entries of
+    at least `mmap_bytes` are memory-mapped on read instead of copied.
+    Each process keeps its own disk index (rebuilt from file mtimes), so the
+    directory can briefly run over `disk_bytes` while several workers write.
+    """
+
+    def __init__(
+        self,
+        path: str = ARTIFACT_DIR,
+        memory_bytes: int = ARTIFACT_MEMORY_BYTES,
+        disk_bytes: int = ARTIFACT_DISK_BYTES,
+        mmap_bytes: int = ARTIFACT_MMAP_BYTES,
+    ):
+        self.path = path
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.mmap_bytes = mmap_bytes
+        self._lock = threading.Lock()
+        self._memory: OrderedDict[str, bytes] = OrderedDict()
+        self._memory_size = 0
+        self._disk: OrderedDict[str, int] | None = None
+        self._disk_size = 0
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, key[:2], key)
+
+    def _load_index(self):
+        if self._disk is not None:
+            return
+        entries = []
+        if os.path.isdir(self.path):
+            for folder in os.scandir(self.path):
+                if not folder.is_dir():
+                    continue
+                for entry in os.scandir(folder.path):
+                    if entry.is_file() and not entry.name.endswith(".tmp"):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, entry.name, stat.st_size))
+        entries.sort()
+        self._disk = OrderedDict((name, size) for _, name, size in entries)
+        self._disk_size = sum(self._disk.values())
+
+    def _remember(self, key: str, data: bytes):
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return
+        if len(data) >= self.mmap_bytes or len(data) > self.memory_bytes:
+            return
+        self._memory[key] = data
+        self._memory_size += len(data)
+        while self._memory_size > self.memory_bytes:
+            _, old = self._memory.popitem(last=False)
+            self._memory_size -= len(old)
+
+    def _index(self, key: str, size: int | None):
+        """Record (size) or forget (None) a disk entry, then evict down to disk_bytes."""
+        self._load_index()
+        self._disk_size -= self._disk.pop(key, 0)
+        if size is None:
+            return
+        self._disk[key] = size
+        self._disk_size += size
+        while self._disk_size > self.disk_bytes and len(self._disk) > 1:
+            old, old_size = self._disk.popitem(last=False)
+            self._disk_size -= old_size
+            try:
+                os.unlink(self._file(old))
+            except FileNotFoundError:
+                pass
+
+    def _read(self, path: str) -> tuple[Blob, int]:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size and size >= self.mmap_bytes:
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), size
+            return f.read(), size
+
+    def _stored(self, key: str, blob: Blob, size: int):
+        with self._lock:
+            self._index(key, size)
+            if isinstance(blob, bytes):
+                self._remember(key, blob)
+
+    def get(self, key: str) -> Blob | None:
+        """Stored bytes for key, an mmap for large disk entries, or None."""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                return data
+        path = self._file(key)
+        try:
+            blob, size = self._read(path)
+            os.utime(path)  # keeps LRU order across restarts
+        except FileNotFoundError:
+            with self._lock:
+                self._index(key, None)
+            return None
+        self._stored(key, blob, size)
+        return blob
+
+    def _target(self, key: str) -> str:
+        """A temporary file next to key's final path."""
+        folder = os.path.dirname(self._file(key))
+        os.makedirs(folder, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=folder, suffix=".tmp")
+        os.close(fd)
+        return tmp
+
+    def put(self, key: str, data: bytes):
+        with self._lock:
+            self._remember(key, data)
+        tmp = self._target(key)
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, self._file(key))
+        with self._lock:
+            self._index(key, len(data))
+
+    def put_file(self, key: str, path: str) -> Blob:
+        """Move a finished file (e.g. a rendered PDF) into the store and return its content."""
+        tmp = self._target(key)
+        shutil.move(path, tmp)
+        os.replace(tmp, self._file(key))
+        blob, size = self._read(self._file(key))
+        self._stored(key, blob, size)
+        return blob
+
+
+artifact_store = ArtifactStore() if ARTIFACT_CACHE_ENABLED else None
+
+
+def etag(key: str) -> str:
+    return f'"{key[:32]}"'
+
+
+def not_modified(request: Request | None, key: str) -> Response | None:
+    """
+    A 304 response when If-None-Match names this artifact. The ETag stands for
+    the (operation, input, parameters) hash, so it is checked before any work.
+    """
+    if request is None:
+        return None
+    header = request.headers.get("if-none-match")
+    if not header:
+        return None
+    tag = etag(key)
+    tags = [t.strip().removeprefix("W/") for t in header.split(",")]
+    if "*" in tags or tag in tags:
+        return Response(status_code=304, headers={"ETag": tag})
+    return None
+
+
+async def load(key: str) -> Blob | None:
+    if artifact_store is None:
+        return None
+    try:
+        blob = await asyncio.to_thread(artifact_store.get, key)
+    except OSError as e:
+        logger.warning(f"Artifact read failed for {key}: {e}")
+        blob = None
+    cache_lookup("artifact", blob is not None)
+    return blob
+
+
+async def save(key: str, data: bytes):
+    if artifact_store is None:
+        return
+    try:
+        await asyncio.to_thread(artifact_store.put, key, data)
+    except OSError as e:
+        logger.warning(f"Artifact write failed for {key}: {e}")
+
+
+async def save_file(key: str, path: str) -> Blob | None:
+    """Move path into the store; None (and path left in place) when the store is off or fails."""
+    if artifact_store is None:
+        return None
+    try:
+        return await asyncio.to_thread(artifact_store.put_file, key, path)
+    except OSError as e:
+        logger.warning(f"Artifact write failed for {key}: {e}")
+        return None
+
+
+async def _iter_mmap(blob: mmap.mmap) -> AsyncIterator[bytes]:
+    try:
+        for start in range(0, len(blob), ARTIFACT_CHUNK_BYTES):
+            yield blob[start:start + ARTIFACT_CHUNK_BYTES]
+    finally:
+        blob.close()
+
+
+def blob_response(blob: Blob, key: str, media_type: str, headers: dict | None = None) -> Response:
+    headers = {**(headers or {}), "ETag": etag(key)}
+    if isinstance(blob, bytes):
+        return Response(blob, media_type=media_type, headers=headers)
+    headers["Content-Length"] = str(len(blob))
+    return StreamingResponse(_iter_mmap(blob), media_type=media_type, headers=headers)
+
+
+async def cached_json(key: str, compute: Callable[[], Awaitable[dict]]) -> dict:
+    """compute() once per key; later calls are answered from the store."""
+    blob = await load(key)
+    if blob is not None:
+        if isinstance(blob, mmap.mmap):
+            with blob:
+                return json.loads(blob[:])
+        return json.loads(blob)
+    result = await compute()
+    await save(key, json.dumps(result, ensure_ascii=False).encode("utf-8"))
+    return result
+
+
+def json_response(result: dict, key: str) -> JSONResponse:
+    return JSONResponse(result, headers={"ETag": etag(key)})
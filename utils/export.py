@@ -0,0 +1,175 @@
+import asyncio
+import os
+import re
+import tempfile
+from typing import AsyncIterator
+
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+
+from utils.artifacts import artifact_key, blob_response, etag, load, not_modified, save_file
+from utils.metrics import LOCAL_WORK
+from utils.workers import run_in_process
+
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+MEDIA_TYPES = {
+    "pdf": "application/pdf",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+}
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.*)$")
+_BULLET = re.compile(r"^\s*[-*•]\s+(.*)$")
+_NUMBERED = re.compile(r"^\s*(\d+[.)])\s+(.*)$")
+_INLINE = re.compile(r"\*\*|__|`")
+_BOLD_SPLIT = re.compile(r"(\*\*.+?\*\*)")
+
+def parse_markdown(text: str) -> list[tuple[str, str, str]]:
+    """
+    Turn markdown into (kind, marker, text) blocks.
+    kind is one of: heading1..heading6, bullet, numbered, paragraph, blank.
+    """
+    blocks = []
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            blocks.append(("blank", "", ""))
+        elif m := _HEADING.match(stripped):
+            blocks.append((f"heading{len(m.group(1))}", "", m.group(2)))
+        elif m := _BULLET.match(line):
+            blocks.append(("bullet", "•", m.group(1)))
+        elif m := _NUMBERED.match(line):
+            blocks.append(("numbered", m.group(1), m.group(2)))
+        else:
+            blocks.append(("paragraph", "", stripped))
+    return blocks
+
+
+def _render_pdf(text: str, path: str):
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.utils import simpleSplit
+    from reportlab.pdfgen import canvas
+
+    width, height = letter
+    margin = 50
+    fonts = {
+        "heading1": ("Helvetica-Bold", 16),
+        "heading2": ("Helvetica-Bold", 14),
+        "heading3": ("Helvetica-Bold", 12),
+    }
+
+    p = canvas.Canvas(path, pagesize=letter)
+    y = height - margin
+
+    def new_page():
+        nonlocal y
+        p.showPage()
+        y = height - margin
+
+    for kind, marker, content in parse_markdown(text):
+        if kind == "blank":
+            y -= 8
+            if y < margin:
+                new_page()
+            continue
+
+        content = _INLINE.sub("", content)
+        if kind.startswith("heading"):
+            font, size = fonts.get(kind, ("Helvetica-Bold", 11))
+        else:
+            font, size = "Helvetica", 11
+        leading = size + 3
+        indent = 18 if marker else 0
+        lines = simpleSplit(content, font, size, width - 2 * margin - indent) or [""]
+
+        if kind.startswith("heading"):
+            y -= 6
+        for i, line in enumerate(lines):
+            if y - leading < margin:
+                new_page()
+            y -= leading
+            p.setFont(font, size)
+            if marker and i == 0:
+                p.drawString(margin, y, marker)
+            p.drawString(margin + indent, y, line)
+
+    p.showPage()
+    p.save()
+
+
+def _add_docx_runs(paragraph, content: str):
+    for part in _BOLD_SPLIT.split(content):
+        if not part:
+            continue
+        if part.startswith("**") and part.endswith("**") and len(part) > 4:
+            paragraph.add_run(part[2:-2]).bold = True
+        else:
+            paragraph.add_run(_INLINE.sub("", part))
+
+
+def _render_docx(text: str, path: str):
+    from docx import Document
+
+    doc = Document()
+    for kind, marker, content in parse_markdown(text):
+        if kind == "blank":
+            continue
+        if kind.startswith("heading"):
+            doc.add_heading(_INLINE.sub("", content), level=min(int(kind[-1]), 9))
+        elif kind == "bullet":
+            _add_docx_runs(doc.add_paragraph(style="List Bullet"), content)
+        elif kind == "numbered":
+            _add_docx_runs(doc.add_paragraph(style="List Number"), content)
+        else:
+            _add_docx_runs(doc.add_paragraph(), content)
+    doc.save(path)
+
+
+_RENDERERS = {
+    "pdf": _render_pdf,
+    "docx": _render_docx,
+}
+
+
+def render_document(text: str, fmt: str) -> str:
+    """Render text to a temporary file and return its path (runs in a worker process)."""
+    fd, path = tempfile.mkstemp(suffix=f".{fmt}")
+    os.close(fd)
+    try:
+        _RENDERERS[fmt](text, path)
+    except Exception:
+        os.unlink(path)
+        raise
+    return path
+
+
+async def _stream_file(path: str) -> AsyncIterator[bytes]:
+    try:
+        with open(path, "rb") as f:
+            while chunk := await asyncio.to_thread(f.read, EXPORT_CHUNK_BYTES):
+                yield chunk
+    finally:
+        os.unlink(path)
+
+
+async def export_response(text: str, fmt: str, filename: str, request: Request | None = None) -> Response:
+    """
+    Render text as a PDF or DOCX in the worker process pool, keep the file in
+    the artifact store and send it back in chunks. Repeated exports of the
+    same text are served from the store without rendering.
+    """
+    key = artifact_key("export", text, fmt=fmt)
+    headers = {"Content-Disposition": f"attachment; filename={filename}.{fmt}"}
+    cached = not_modified(request, key)
+    if cached is not None:
+        return cached
+    blob = await load(key)
+    if blob is None:
+        with LOCAL_WORK.time(f"render_{fmt}"):
+            path = await run_in_process(render_document, text, fmt)
+        blob = await save_file(key, path)
+        if blob is None:
+            return StreamingResponse(
+                _stream_file(path), media_type=MEDIA_TYPES[fmt], headers={**headers, "ETag": etag(key)}
+            )
+    return blob_response(blob, key, MEDIA_TYPES[fmt], headers)
@@ -0,0 +1,184 @@
+import codecs
+import os
+import tempfile
+
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+
+from utils.metrics import LOCAL_WORK
+from utils.tokens import chars_for_tokens, truncate_tokens
+from utils.workers import run_in_process
+
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+UPLOAD_READ_BYTES = 1024 * 1024
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+def _too_large() -> JSONResponse:
+    return JSONResponse(status_code=413, content={"detail": "File too large"})
+
+
+class UploadLimitMiddleware:
+    """
+    Pure ASGI middleware capping request bodies at max_bytes. A larger
+    Content-Length is rejected before anything is read; otherwise received
+    bytes are counted and the request fails with 413 as soon as they pass
+    the cap, so chunked uploads are never buffered in full.
+    """
+
+    def __init__(self, app, max_bytes: int = MAX_UPLOAD_BYTES):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        for name, value in scope["headers"]:
+            if name == b"content-length" and value.isdigit() and int(value) > self.max_bytes:
+                return await _too_large()(scope, receive, send)
+
+        received = 0
+        exceeded = False
+        started = False
+
+        async def receive_wrapper():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    exceeded = True
+                    raise UploadTooLarge()
+            return message
+
+        async def send_wrapper(message):
+            nonlocal started
+            # The app's own error for the aborted body is replaced by a 413.
+            if exceeded and not started:
+                return
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        except Exception:
+            if not exceeded or started:
+                raise
+        if exceeded and not started:
+            await _too_large()(scope, receive, send)
+
+
+def _detect_kind(path: str, filename: str) -> str:
+    with open(path, "rb") as f:
+        head = f.read(8)
+    name = filename.lower()
+    if head.startswith(b"%PDF") or name.endswith(".pdf"):
+        return "pdf"
+    if head.startswith(b"PK") and name.endswith(".docx"):
+        return "docx"
+    return "text"
+
+
+def _extract_pdf(path: str, max_chars: int) -> list[str]:
+    from pdfminer.high_level import extract_pages
+    from pdfminer.layout import LTTextContainer
+
+    parts, total = [], 0
+    for page in extract_pages(path):
+        for element in page:
+            if isinstance(element, LTTextContainer):
+                text = element.get_text()
+                parts.append(text)
+                total += len(text)
+        parts.append("\n")
+        if total >= max_chars:
+            break
+    return parts
+
+
+def _extract_docx(path: str, max_chars: int) -> list[str]:
+    from docx import Document
+
+    parts, total = [], 0
+    for paragraph in Document(path).paragraphs:
+        parts.append(paragraph.text + "\n")
+        total += len(paragraph.text) + 1
+        if total >= max_chars:
+            break
+    return parts
+
+
+def _extract_plain(path: str, max_chars: int) -> list[str]:
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    parts, total = [], 0
+    with open(path, "rb") as f:
+        # A character is at least one byte, so never read more bytes than
+        # the characters still wanted.
+        while total < max_chars and (chunk := f.read(min(UPLOAD_READ_BYTES, max_chars - total))):
+            text = decoder.decode(chunk)
+            parts.append(text)
+            total += len(text)
+        parts.append(decoder.decode(b"", final=True))
+    return parts
+
+
+_EXTRACTORS = {
+    "pdf": _extract_pdf,
+    "docx": _extract_docx,
+    "text": _extract_plain,
+}
+
+
+def extract_text(path: str, filename: str, max_tokens: int) -> str:
+    """
+    Extract up to max_tokens tokens of text from a PDF, DOCX or plain-text
+    file, page by page, stopping once enough characters have been read, and
+    cut at a paragraph or sentence end. Runs in a worker process.
+    """
+    kind = _detect_kind(path, filename)
+    max_chars = chars_for_tokens(max_tokens)
+    return truncate_tokens("".join(_EXTRACTORS[kind](path, max_chars))[:max_chars], max_tokens)
+
+
+async def _spool_upload(file: UploadFile, max_bytes: int) -> str:
+    fd, path = tempfile.mkstemp(suffix=os.path.splitext(file.filename or "")[1])
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := await file.read(UPLOAD_READ_BYTES):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge()
+                out.write(chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path
+
+
+async def extract_upload(file: UploadFile, max_tokens: int, max_bytes: int = MAX_UPLOAD_BYTES) -> str:
+    """
+    Text of an uploaded PDF/DOCX/text file, truncated to max_tokens tokens.
+    The request body is capped by UploadLimitMiddleware while it arrives;
+    the upload is copied to a temp file in 1 MB chunks for the worker
+    process, which reads only as much of it as the token budget needs.
+    """
+    if file.size is not None and file.size > max_bytes:
+        raise HTTPException(status_code=413, detail="File too large")
+    try:
+        path = await _spool_upload(file, max_bytes)
+    except UploadTooLarge:
+        raise HTTPException(status_code=413, detail="File too large")
+
+    try:
+        with LOCAL_WORK.time("extract"):
+            return await run_in_process(extract_text, path, file.filename or "", max_tokens)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Could not read file: {e}")
+    finally:
+        os.unlink(path)
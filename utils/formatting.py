@@ -0,0 +1,211 @@
+import re
+
+_WS = " \t\r\n"
+_SENTENCE_END = ".!?:"
+_MARKER = r"(?P<mk>{num}[.)]|[-•]|#{{1,6}})(?=[ \t])"
+# A list/heading marker at the start of a line ("2020. Then" is not one).
+_LINE_MARKER = re.compile(r"[ \t\r]*" + _MARKER.format(num=r"\d{1,3}"))
+# The only places that need a decision: line breaks (real or a literal "\n")
+# with the whitespace after them, and markers written inline after a space.
+# Each alternative starts with a literal character so the regex engine can
+# skip straight to candidates.
+_BREAK_TAIL = r"(?:[ \t\r\n]|\\n)*"
+_TOKEN = re.compile(
+    r"\n" + _BREAK_TAIL + r"|\\n" + _BREAK_TAIL + r"|\ [ \t]*" + _MARKER.format(num=r"\d{1,2}")
+)
+_TRAILING_WS = re.compile(r"(?:\s|\\n)+\Z")
+_MAX_HELD_WORD = 7  # longest marker, e.g. "######" or "999."
+
+
+class MarkdownNormalizer:
+    """
+    Single-pass, incremental clean-up of model markdown.
+
+    - List items ("1.", "1)", "-", "•") and headings ("#".."######") start on
+      their own line, with one space after the marker.
+    - Literal "\\n" sequences become newlines; 3+ newlines collapse to 2.
+    - Leading and trailing whitespace is dropped; fenced code is left as is.
+
+    A "-" only starts an item at the beginning of a line, after sentence
+    punctuation or on a line that is already a "-" item, so hyphens and
+    dashes inside sentences are kept. feed() returns the output that is
+    final so far; the last short word of a chunk is held back until the
+    next chunk shows whether it is a marker.
+    """
+
+    def __init__(self):
+        self._out: list[str] = []
+        self._pending = ""       # unprocessed tail of the input
+        self._ws = ""            # whitespace run not written yet
+        self._started = False
+        self._prev = ""          # last non-whitespace character written
+        self._line = ""          # first characters of the current output line
+        self._line_bullet = False
+        self._fence_closed = False
+        self._after_marker = False
+        self._in_code = False
+
+    def feed(self, text: str) -> str:
+        buf = self._pending + text
+        if not self._started and not self._in_code:
+            buf = buf.lstrip(" \t\r")
+        end = self._safe_end(buf)
+        self._pending = buf[self._process(buf, end, final=False):]
+        return self._take()
+
+    def finish(self) -> str:
+        buf, self._pending = self._pending, ""
+        if not self._in_code:
+            buf = _TRAILING_WS.sub("", buf)
+        self._process(buf, len(buf), final=True)
+        self._ws = ""
+        return self._take()
+
+    def _take(self) -> str:
+        out = "".join(self._out)
+        self._out.clear()
+        return out
+
+    @staticmethod
+    def _safe_end(buf: str) -> int:
+        """Where to stop so a marker split across chunks is not missed."""
+        end = len(buf)
+        if end and buf[-1] == "\\":
+            end -= 1
+        while end > 0 and buf[end - 1] in " \t\r":
+            end -= 1
+        j = end
+        while j > 0 and end - j <= _MAX_HELD_WORD and buf[j - 1] not in _WS and buf[j - 2:j] != "\\n":
+            j -= 1
+        if j == 0 or buf[j - 1] in _WS or buf[j - 2:j] == "\\n":
+            while j > 0 and buf[j - 1] in " \t\r":
+                j -= 1
+            return j
+        return end
+
+    def _write(self, text: str):
+        self._out.append(text)
+        newline = text.rfind("\n")
+        if newline >= 0:
+            self._line = text[newline + 1:newline + 4]
+            self._line_bullet = False
+            self._fence_closed = False
+        elif len(self._line) < 3:
+            self._line = (self._line + text)[:3]
+        last = text[-1:]
+        if last in _WS:
+            last = text.rstrip()[-1:]
+        if last:
+            self._prev = last
+            self._started = True
+
+    def _line_break(self) -> str:
+        """Output for the held whitespace run, which always holds a line break."""
+        ws, self._ws = self._ws, ""
+        return "\n\n" if ws.count("\n") + ws.count("\\n") > 1 else "\n"
+
+    def _text(self, text: str):
+        if self._after_marker or self._ws:
+            # Spaces after a marker or a line break may arrive in a later chunk.
+            text = text.lstrip(" \t\r")
+            if not text:
+                return
+            self._after_marker = False
+            if self._ws:
+                brk = self._line_break()
+                if self._started:
+                    text = brk + text
+        self._write(text)
+
+    def _newlines(self, ws: str):
+        if self._line == "```" and not self._fence_closed and "\n" in ws:
+            # End of an opening fence line: copy the code block verbatim.
+            self._ws = ""
+            cut = ws.index("\n") + 1
+            self._write("\n")
+            self._in_code = True
+            if cut < len(ws):
+                self._write(ws[cut:])
+            return
+        self._ws += ws
+
+    def _marker_allowed(self, marker: str, line_start: bool) -> bool:
+        if self._after_marker:
+            return False
+        if line_start or marker == "•" or marker[0].isdigit():
+            return True
+        if marker == "-":
+            return self._prev in _SENTENCE_END or self._line_bullet
+        return self._prev in _SENTENCE_END  # heading
+
+    def _marker(self, marker: str):
+        brk = self._line_break() if self._ws else "\n"
+        self._out.append(f"{brk}{marker} " if self._started else f"{marker} ")
+        self._line = marker[:3]
+        self._prev = marker[-1]
+        self._started = True
+        self._line_bullet = marker == "-"
+        self._fence_closed = False
+        self._after_marker = True
+
+    def _find_closing_fence(self, buf: str, pos: int, end: int) -> int:
+        i = pos
+        while True:
+            i = buf.find("```", i, end)
+            if i < 0:
+                return -1
+            if (i == pos and self._line == "") or (i > pos and buf[i - 1] == "\n"):
+                return i
+            i += 1
+
+    def _process(self, buf: str, end: int, final: bool) -> int:
+        """
+        Consume buf[:end] and return how far it got: a token starting before
+        end may run past it, code blocks may stop short of it.
+        """
+        pos = 0
+        while pos < end:
+            if self._in_code:
+                close = self._find_closing_fence(buf, pos, end)
+                if close < 0:
+                    # Keep a possible partial fence ("``") for the next chunk.
+                    stop = end if final else max(pos, end - 2)
+                    self._write(buf[pos:stop])
+                    return stop
+                self._write(buf[pos:close + 3])
+                self._in_code = False
+                self._fence_closed = True
+                pos = close + 3
+                continue
+
+            if not self._started or self._ws:
+                m = _LINE_MARKER.match(buf, pos)
+                if m:
+                    self._marker(m.group("mk"))
+                    pos = m.end()
+                    continue
+
+            m = _TOKEN.search(buf, pos)
+            if m is None or m.start() >= end:
+                self._text(buf[pos:end])
+                return end
+            marker = m.group("mk")
+            if marker is None:
+                text = buf[pos:m.start()].rstrip(" \t\r")
+                if text:
+                    self._text(text)
+                self._newlines(m.group())
+            else:
+                if m.start() > pos:
+                    self._text(buf[pos:m.start()])
+                if self._marker_allowed(marker, line_start=False):
+                    self._marker(marker)
+                else:
+                    self._text(m.group())
+            pos = m.end()
+        return pos
+
+
+def normalize_markdown(text: str) -> str:
+    normalizer = MarkdownNormalizer()
+    return normalizer.feed(text) + normalizer.finish()
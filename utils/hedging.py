@@ -0,0 +1,105 @@
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Awaitable, Callable, TypeVar
+
+from utils.metrics import UPSTREAM_HEDGES
+
+T = TypeVar("T")
+
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "0") == "1"
+# A second request is sent once the first has run longer than this
+# percentile of the route's recent latencies.
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "0.95"))
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "0.5"))
+# Hedges may add at most this fraction of extra upstream calls.
+HEDGE_BUDGET = float(os.getenv("HEDGE_BUDGET", "0.05"))
+HEDGE_WINDOW = int(os.getenv("HEDGE_WINDOW", "200"))
+# No hedging for a route until it has this many latency samples.
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+
+
+class Hedger:
+    """
+    Hedged requests: if a call has not answered after the `percentile` of
+    its route's last `window` latencies, an identical second call is
+    started; the first to succeed wins and the other is cancelled.
+    Each call earns `budget` hedge tokens (up to budget * window) and each
+    hedge spends one, which caps the extra upstream load at `budget`.
+    """
+
+    def __init__(
+        self,
+        percentile: float = HEDGE_PERCENTILE,
+        min_delay: float = HEDGE_MIN_DELAY,
+        budget: float = HEDGE_BUDGET,
+        window: int = HEDGE_WINDOW,
+        min_samples: int = HEDGE_MIN_SAMPLES,
+    ):
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.budget = budget
+        self.window = window
+        self.min_samples = min_samples
+        self._latencies: dict[str, deque[float]] = {}
+        self._tokens = 0.0
+        self._max_tokens = max(1.0, budget * window)
+
+    def delay(self, route: str) -> float | None:
+        """Seconds to wait before hedging a call on route, None while samples are too few."""
+        samples = self._latencies.get(route)
+        if not samples or len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        index = min(len(ordered) - 1, int(self.percentile * len(ordered)))
+        return max(self.min_delay, ordered[index])
+
+    def _record(self, route: str, seconds: float):
+        self._latencies.setdefault(route, deque(maxlen=self.window)).append(seconds)
+
+    def _spend(self) -> bool:
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    async def run(self, route: str, call: Callable[[], Awaitable[T]]) -> T:
+        self._tokens = min(self._max_tokens, self._tokens + self.budget)
+        delay = self.delay(route)
+        start = time.perf_counter()
+        primary = asyncio.ensure_future(call())
+        if delay is not None:
+            try:
+                done, _ = await asyncio.wait({primary}, timeout=delay)
+            except asyncio.CancelledError:
+                primary.cancel()
+                raise
+            if not done:
+                if self._spend():
+                    result = await self._race(route, primary, asyncio.ensure_future(call()))
+                    self._record(route, time.perf_counter() - start)
+                    return result
+                UPSTREAM_HEDGES.inc(route, "over_budget")
+        result = await primary
+        self._record(route, time.perf_counter() - start)
+        return result
+
+    async def _race(self, route: str, primary: asyncio.Future, hedge: asyncio.Future):
+        """First successful result of the two; raises the primary's error if both fail."""
+        pending = {primary, hedge}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if not task.cancelled() and task.exception() is None:
+                        UPSTREAM_HEDGES.inc(route, "won" if task is hedge else "lost")
+                        return task.result()
+            UPSTREAM_HEDGES.inc(route, "failed")
+            return primary.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+hedger = Hedger() if HEDGE_ENABLED else None
@@ -0,0 +1,80 @@
+import re
+
+GREETING = "greeting"
+STUDY = "study"
+OFF_TOPIC = "off_topic"
+
+GREETING_WORDS = [
+    # English / Roman Urdu
+    "hi", "hello", "hey", "hiya", "good morning", "good afternoon", "good evening",
+    "salam", "salaam", "assalam", "assalamu", "assalamualaikum", "assalamu alaikum",
+    "asalam o alaikum", "aoa", "adaab",
+    # Urdu / Arabic script
+    "السلام علیکم", "السلام عليكم", "سلام", "ہیلو", "مرحبا", "آداب",
+    # Others
+    "hola", "bonjour", "namaste", "merhaba",
+]
+
+# Small talk that may follow a greeting ("hey, how are you?").
+SMALL_TALK = [
+    "how are you", "how r u", "how are you doing", "what's up", "whats up", "sup",
+    "kaise ho", "kaisay ho", "kya haal hai", "kia haal hai", "aap kaise hain",
+    "کیسے ہو", "آپ کیسے ہیں", "کیا حال ہے", "كيف حالك",
+]
+
+STUDY_KEYWORDS = [
+    # English
+    "study", "explain", "summarize", "summary", "lecture", "homework", "assignment",
+    "exercise", "math", "maths", "mathematics", "algebra", "geometry", "calculus",
+    "physics", "chemistry", "biology", "history", "geography", "economics",
+    "computer science", "programming", "grammar", "essay", "exam", "quiz", "test",
+    "concept", "theory", "formula", "equation", "define", "definition", "example",
+    "solve", "calculate", "prove", "difference between", "cells", "law", "laws",
+    "what", "why", "when", "how", "where", "which", "who",
+    # Roman Urdu
+    "kya", "kyun", "kyu", "kaise", "kab", "kahan", "samjhao", "samjhayen", "batao",
+    "matlab", "sawal", "parhai",
+    # Urdu
+    "کیا", "کیوں", "کیسے", "کب", "کہاں", "سمجھائیں", "وضاحت", "مطلب", "سوال",
+    "ریاضی", "طبیعیات", "کیمیا", "حیاتیات", "تاریخ", "امتحان", "مضمون",
+    # Arabic
+    "ما", "ماذا", "لماذا", "كيف", "متى", "أين", "اشرح", "عرف", "رياضيات",
+    "فيزياء", "كيمياء", "أحياء", "تاريخ", "امتحان", "سؤال",
+]
+
+
+def _alternation(words: list[str]) -> str:
+    # Longest first so multi-word phrases win over their prefixes.
+    return "|".join(re.escape(w) for w in sorted(set(words), key=len, reverse=True))
+
+
+_GREETING_PREFIX = re.compile(
+    rf"^\W*(?:{_alternation(GREETING_WORDS)})(?!\w)[\W_]*", re.IGNORECASE
+)
+_SMALL_TALK = re.compile(
+    rf"^\W*(?:{_alternation(SMALL_TALK)})(?:\W+(?:sir|madam|miss|bro|there|everyone))?[\W_]*$",
+    re.IGNORECASE,
+)
+_STUDY = re.compile(rf"(?<!\w)(?:{_alternation(STUDY_KEYWORDS)})(?!\w)", re.IGNORECASE)
+
+# A greeting followed by at most this many words ("hi there", "salam sir")
+# is answered locally.
+GREETING_TAIL_WORDS = 3
+
+
+def classify(text: str) -> str:
+    """
+    Classify a chat message as GREETING, STUDY or OFF_TOPIC without calling
+    the model. Matching is on whole words, so "how" does not match "show".
+    """
+    greeting = _GREETING_PREFIX.match(text)
+    if greeting:
+        rest = text[greeting.end():]
+        if not rest or _SMALL_TALK.match(rest):
+            return GREETING
+        if not _STUDY.search(rest) and len(rest.split()) <= GREETING_TAIL_WORDS:
+            return GREETING
+        text = rest
+    if _STUDY.search(text):
+        return STUDY
+    return OFF_TOPIC
@@ -0,0 +1,308 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", "jobs.db")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "100"))
+# Finished (and failed) jobs are kept this long, then purged.
+JOB_RESULT_TTL = float(os.getenv("JOB_RESULT_TTL", str(24 * 3600)))
+# Live workers refresh their unfinished jobs several times per lease; jobs
+# not refreshed for this long belong to a dead process and are taken over.
+JOB_LEASE = float(os.getenv("JOB_LEASE", "60"))
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+FINISHED = (DONE, FAILED)
+
+Handler = Callable[[dict], Awaitable[Any]]
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+def content_key(kind: str, payload: dict) -> str:
+    """Hash identifying a job by what it computes, used to deduplicate submissions."""
+    data = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(f"{kind}\x1f{data}".encode("utf-8")).hexdigest()
+
+
+# Identifies this process as a job owner. Unlike a PID it is never reused,
+# so a restarted container cannot mistake an old job for its own.
+BOOT_ID = str(uuid.uuid4())
+
+
+class JobStore:
+    """
+    Job state in a WAL-mode SQLite file, shared by all workers on the host.
+    A partial unique index on (kind, key) makes deduplication atomic across
+    processes; failed jobs are left out of it so they can be resubmitted.
+    """
+
+    def __init__(self, path: str = JOB_DB_PATH):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False, timeout=5.0)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, "
+            "kind TEXT NOT NULL, "
+            "key TEXT NOT NULL, "
+            "status TEXT NOT NULL, "
+            "payload TEXT NOT NULL, "
+            "result TEXT, "
+            "error TEXT, "
+            "owner TEXT NOT NULL, "
+            "created REAL NOT NULL, "
+            "updated REAL NOT NULL, "
+            "expires REAL)"
+        )
+        self._conn.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS jobs_key ON jobs (kind, key) WHERE status != 'failed'"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_expires ON jobs (expires)")
+
+    def create(self, kind: str, key: str, payload: dict) -> tuple[dict, bool]:
+        """Insert a queued job, or return the live job with the same key. Second value: created."""
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs WHERE kind = ? AND key = ? AND expires <= ?", (kind, key, now))
+            try:
+                self._conn.execute(
+                    "INSERT INTO jobs (id, kind, key, status, payload, owner, created, updated) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (job_id, kind, key, QUEUED, json.dumps(payload, ensure_ascii=False), BOOT_ID, now, now),
+                )
+                created = True
+            except sqlite3.IntegrityError:
+                created = False
+            row = self._conn.execute(
+                "SELECT * FROM jobs WHERE kind = ? AND key = ? AND status != 'failed'", (kind, key)
+            ).fetchone()
+        return self._to_dict(row), created
+
+    def get(self, job_id: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM jobs WHERE id = ? AND (expires IS NULL OR expires > ?)", (job_id, time.time())
+            ).fetchone()
+        return self._to_dict(row) if row else None
+
+    def delete(self, job_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def set_running(self, job_id: str):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, updated = ? WHERE id = ?", (RUNNING, time.time(), job_id)
+            )
+
+    def finish(self, job_id: str, ttl: float, result: Any = None, error: str | None = None):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, updated = ?, expires = ? WHERE id = ?",
+                (
+                    FAILED if error is not None else DONE,
+                    None if error is not None else json.dumps(result, ensure_ascii=False),
+                    error,
+                    now,
+                    now + ttl,
+                    job_id,
+                ),
+            )
+
+    def heartbeat(self):
+        """Renew the lease on every unfinished job owned by this process."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET updated = ? WHERE owner = ? AND status IN (?, ?)",
+                (time.time(), BOOT_ID, QUEUED, RUNNING),
+            )
+
+    def claim_orphans(self, lease: float = JOB_LEASE, limit: int = -1) -> list[tuple[str, str, dict]]:
+        """Take over up to limit unfinished jobs of other processes whose lease has expired."""
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, kind, payload, owner FROM jobs "
+                "WHERE status IN (?, ?) AND owner != ? AND updated <= ? ORDER BY created LIMIT ?",
+                (QUEUED, RUNNING, BOOT_ID, now - lease, limit),
+            ).fetchall()
+            claimed = []
+            for row in rows:
+                cursor = self._conn.execute(
+                    "UPDATE jobs SET owner = ?, status = ?, updated = ? WHERE id = ? AND owner = ?",
+                    (BOOT_ID, QUEUED, now, row["id"], row["owner"]),
+                )
+                if cursor.rowcount:
+                    claimed.append((row["id"], row["kind"], json.loads(row["payload"])))
+        return claimed
+
+    def purge(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs WHERE expires <= ?", (time.time(),))
+
+    def close(self):
+        self._conn.close()
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> dict:
+        return {
+            "id": row["id"],
+            "kind": row["kind"],
+            "status": row["status"],
+            "result": json.loads(row["result"]) if row["result"] is not None else None,
+            "error": row["error"],
+            "created": row["created"],
+            "updated": row["updated"],
+            "expires": row["expires"],
+        }
+
+
+class JobManager:
+    """
+    Runs registered async handlers as background jobs on a bounded pool of
+    JOB_WORKERS tasks. submit() returns at once; state lives in a JobStore so
+    any worker process can answer status requests.
+    """
+
+    def __init__(
+        self,
+        path: str = JOB_DB_PATH,
+        workers: int = JOB_WORKERS,
+        queue_size: int = JOB_QUEUE_SIZE,
+        ttl: float = JOB_RESULT_TTL,
+        lease: float = JOB_LEASE,
+    ):
+        self.path = path
+        self.workers = workers
+        self.ttl = ttl
+        self.lease = lease
+        self._handlers: dict[str, Handler] = {}
+        self._queue: asyncio.Queue | None = None
+        self._queue_size = queue_size
+        self._tasks: list[asyncio.Task] = []
+        self._events: dict[str, asyncio.Event] = {}
+        self._store: JobStore | None = None
+
+    @property
+    def store(self) -> JobStore:
+        if self._store is None:
+            self._store = JobStore(self.path)
+        return self._store
+
+    def register(self, kind: str, handler: Handler):
+        self._handlers[kind] = handler
+
+    def start(self):
+        self._queue = asyncio.Queue(self._queue_size)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._keep_lease()))
+        self.store.purge()
+        self._adopt_orphans()
+        logger.info(f"Job workers started ({self.workers})")
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._store is not None:
+            self._store.close()
+            self._store = None
+
+    def submit(self, kind: str, payload: dict) -> tuple[dict, bool]:
+        """
+        Queue a job, or return the existing job for identical input.
+        Second value is False when the submission was deduplicated.
+        Raises JobQueueFull when the local queue is at capacity.
+        """
+        if kind not in self._handlers:
+            raise KeyError(f"No handler registered for job kind {kind!r}")
+        if self._queue is None:
+            raise RuntimeError("JobManager.start() has not been called")
+        job, created = self.store.create(kind, content_key(kind, payload), payload)
+        if created:
+            try:
+                self._queue.put_nowait((job["id"], kind, payload))
+            except asyncio.QueueFull:
+                self.store.delete(job["id"])
+                raise JobQueueFull()
+        return job, created
+
+    def get(self, job_id: str) -> dict | None:
+        return self.store.get(job_id)
+
+    async def wait(self, job_id: str, timeout: float) -> dict | None:
+        """Wait up to timeout for a status change of a job run by this process."""
+        event = self._events.setdefault(job_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        job = self.get(job_id)
+        if job is None or job["status"] in FINISHED:
+            self._events.pop(job_id, None)
+        return job
+
+    def _notify(self, job_id: str, finished: bool = False):
+        event = self._events.pop(job_id, None) if finished else self._events.get(job_id)
+        if event is not None:
+            event.set()
+            if not finished:
+                self._events[job_id] = asyncio.Event()
+
+    def _adopt_orphans(self):
+        # Only as many as the queue can take; the rest wait for the next
+        # round or another worker process.
+        free = self._queue.maxsize - self._queue.qsize() if self._queue.maxsize > 0 else -1
+        if free == 0:
+            return
+        for job in self.store.claim_orphans(self.lease, free):
+            self._queue.put_nowait(job)
+
+    async def _keep_lease(self):
+        """Renew this process's leases and pick up jobs left by dead workers."""
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            try:
+                self.store.heartbeat()
+                self._adopt_orphans()
+            except sqlite3.Error as e:
+                logger.error(f"Job lease renewal failed: {e}")
+
+    async def _worker(self):
+        while True:
+            job_id, kind, payload = await self._queue.get()
+            try:
+                await self._run(job_id, kind, payload)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str, kind: str, payload: dict):
+        self.store.set_running(job_id)
+        self._notify(job_id)
+        try:
+            result = await self._handlers[kind](payload)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Job {job_id} ({kind}) failed: {e}")
+            self.store.finish(job_id, self.ttl, error=str(getattr(e, "detail", None) or e))
+        else:
+            self.store.finish(job_id, self.ttl, result=result)
+        self._notify(job_id, finished=True)
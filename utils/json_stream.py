@@ -0,0 +1,50 @@
+import json
+
+
+class JSONArrayItemParser:
+    """
+    Incrementally parse streamed JSON text and return each object element of
+    the first array as soon as its closing brace arrives, e.g. the question
+    objects of {"questions": [{...}, {...}]} while the rest is still coming.
+    """
+
+    def __init__(self):
+        self._stack: list[str] = []
+        self._in_string = False
+        self._escape = False
+        self._array_depth: int | None = None
+        self._item: list[str] | None = None
+
+    def feed(self, text: str) -> list:
+        items = []
+        for ch in text:
+            if self._item is not None:
+                self._item.append(ch)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                self._in_string = True
+            elif ch in "[{":
+                if ch == "{" and self._array_depth is not None and len(self._stack) == self._array_depth:
+                    self._item = [ch]
+                self._stack.append(ch)
+                if ch == "[" and self._array_depth is None:
+                    self._array_depth = len(self._stack)
+            elif ch in "]}":
+                if self._stack:
+                    self._stack.pop()
+                if ch == "}" and self._item is not None and len(self._stack) == self._array_depth:
+                    try:
+                        items.append(json.loads("".join(self._item)))
+                    except ValueError:
+                        pass
+                    self._item = None
+        return items
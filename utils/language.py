@@ -0,0 +1,56 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from utils.metrics import LOCAL_WORK, cache_lookup
+
+DETECT_SAMPLE_CHARS = int(os.getenv("DETECT_SAMPLE_CHARS", "1500"))
+DETECT_CACHE_SIZE = int(os.getenv("DETECT_CACHE_SIZE", "4096"))
+
+_cache: OrderedDict[str, str | None] = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _sample(text: str, limit: int = DETECT_SAMPLE_CHARS) -> str:
+    """Up to `limit` characters taken from the start, middle and end of text."""
+    if len(text) <= limit:
+        return text
+    part = limit // 3
+    middle = len(text) // 2
+    return " ".join((text[:part], text[middle - part // 2:middle + part // 2], text[-part:]))
+
+
+def _detect(text: str) -> str | None:
+    from langdetect import DetectorFactory, detect
+    from langdetect.lang_detect_exception import LangDetectException
+
+    # langdetect is randomized; a fixed seed makes results repeatable.
+    DetectorFactory.seed = 0
+    try:
+        return detect(text).lower()
+    except LangDetectException:
+        return None
+
+
+def detect_language(text: str) -> str | None:
+    """
+    ISO language code of text (e.g. "en", "ur"), or None if it cannot be told.
+    Detection runs on a bounded sample and results are cached by content hash.
+    """
+    key = hashlib.sha1(text.encode("utf-8", errors="ignore")).hexdigest()
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            cache_lookup("language", True)
+            return _cache[key]
+    cache_lookup("language", False)
+
+    with LOCAL_WORK.time("langdetect"):
+        lang = _detect(_sample(text))
+
+    with _cache_lock:
+        _cache[key] = lang
+        if len(_cache) > DETECT_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return lang
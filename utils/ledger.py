@@ -0,0 +1,221 @@
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+
+DEFAULT_CREDIT_TOKENS = int(os.getenv("DEFAULT_CREDIT_TOKENS", "100000"))
+# Balances are restored to DEFAULT_CREDIT_TOKENS once this many hours have
+# passed since the last reset. 0 disables resets.
+CREDIT_RESET_HOURS = float(os.getenv("CREDIT_RESET_HOURS", "24"))
+# "memory" (single process) or "sqlite" (persistent, shared between workers).
+CREDIT_LEDGER = os.getenv("CREDIT_LEDGER", "memory")
+CREDIT_DB_PATH = os.getenv("CREDIT_DB_PATH", "credits.db")
+LEDGER_BATCH_SIZE = int(os.getenv("LEDGER_BATCH_SIZE", "50"))
+LEDGER_FLUSH_SECONDS = float(os.getenv("LEDGER_FLUSH_SECONDS", "1.0"))
+
+
+class CreditLedger(ABC):
+    """Per-user token balances. debit() must be atomic."""
+
+    def __init__(self, default_tokens: int = DEFAULT_CREDIT_TOKENS, reset_hours: float = CREDIT_RESET_HOURS):
+        self.default_tokens = default_tokens
+        self.reset_seconds = reset_hours * 3600
+
+    def _reset_due(self, last_reset: float, now: float) -> bool:
+        return self.reset_seconds > 0 and now - last_reset >= self.reset_seconds
+
+    @abstractmethod
+    def balance(self, user_id: str) -> int:
+        ...
+
+    @abstractmethod
+    def debit(self, user_id: str, tokens: int) -> bool:
+        """Take tokens if the balance covers them. Returns False otherwise."""
+
+    @abstractmethod
+    def refund(self, user_id: str, tokens: int):
+        ...
+
+    @abstractmethod
+    def get_name(self, user_id: str) -> str | None:
+        ...
+
+    @abstractmethod
+    def set_name(self, user_id: str, name: str):
+        ...
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+
+class MemoryLedger(CreditLedger):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._lock = threading.Lock()
+        self._credits: dict[str, dict] = {}
+        self._names: dict[str, str] = {}
+
+    def _entry(self, user_id: str) -> dict:
+        now = time.time()
+        entry = self._credits.get(user_id)
+        if entry is None or self._reset_due(entry["last_reset"], now):
+            entry = {"tokens_left": self.default_tokens, "last_reset": now}
+            self._credits[user_id] = entry
+        return entry
+
+    def balance(self, user_id: str) -> int:
+        with self._lock:
+            return self._entry(user_id)["tokens_left"]
+
+    def debit(self, user_id: str, tokens: int) -> bool:
+        with self._lock:
+            entry = self._entry(user_id)
+            if entry["tokens_left"] >= tokens:
+                entry["tokens_left"] -= tokens
+                return True
+            return False
+
+    def refund(self, user_id: str, tokens: int):
+        with self._lock:
+            self._entry(user_id)["tokens_left"] += tokens
+
+    def get_name(self, user_id: str) -> str | None:
+        return self._names.get(user_id)
+
+    def set_name(self, user_id: str, name: str):
+        self._names[user_id] = name
+
+
+class SQLiteLedger(CreditLedger):
+    """
+    SQLite (WAL) ledger that is safe to share between uvicorn workers.
+    Debits are a single conditional UPDATE, so concurrent processes can never
+    overdraw a balance. Refunds and name changes are queued and written in
+    one transaction every LEDGER_BATCH_SIZE writes or LEDGER_FLUSH_SECONDS.
+    """
+
+    def __init__(self, path: str = CREDIT_DB_PATH, **kwargs):
+        super().__init__(**kwargs)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS credits ("
+            "user_id TEXT PRIMARY KEY, "
+            "tokens_left INTEGER NOT NULL, "
+            "last_reset REAL NOT NULL, "
+            "name TEXT)"
+        )
+        self._pending_refunds: dict[str, int] = {}
+        self._pending_names: dict[str, str] = {}
+        self._known_names: dict[str, str | None] = {}
+        self._pending_count = 0
+        self._last_flush = time.monotonic()
+
+    def _ensure(self, user_id: str):
+        now = time.time()
+        self._conn.execute(
+            "INSERT OR IGNORE INTO credits (user_id, tokens_left, last_reset) VALUES (?, ?, ?)",
+            (user_id, self.default_tokens, now),
+        )
+        if self.reset_seconds > 0:
+            self._conn.execute(
+                "UPDATE credits SET tokens_left = ?, last_reset = ? WHERE user_id = ? AND last_reset <= ?",
+                (self.default_tokens, now, user_id, now - self.reset_seconds),
+            )
+
+    def _maybe_flush(self):
+        if (
+            self._pending_count >= LEDGER_BATCH_SIZE
+            or time.monotonic() - self._last_flush >= LEDGER_FLUSH_SECONDS
+        ):
+            self._flush_locked()
+
+    def _flush_locked(self):
+        self._last_flush = time.monotonic()
+        if not self._pending_count:
+            return
+        refunds, names = self._pending_refunds, self._pending_names
+        self._pending_refunds, self._pending_names, self._pending_count = {}, {}, 0
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            for user_id, tokens in refunds.items():
+                self._ensure(user_id)
+                self._conn.execute(
+                    "UPDATE credits SET tokens_left = tokens_left + ? WHERE user_id = ?",
+                    (tokens, user_id),
+                )
+            for user_id, name in names.items():
+                self._ensure(user_id)
+                self._conn.execute("UPDATE credits SET name = ? WHERE user_id = ?", (name, user_id))
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def balance(self, user_id: str) -> int:
+        with self._lock:
+            self._maybe_flush()
+            self._ensure(user_id)
+            row = self._conn.execute(
+                "SELECT tokens_left FROM credits WHERE user_id = ?", (user_id,)
+            ).fetchone()
+            return row[0] + self._pending_refunds.get(user_id, 0)
+
+    def debit(self, user_id: str, tokens: int) -> bool:
+        with self._lock:
+            if user_id in self._pending_refunds:
+                self._flush_locked()
+            else:
+                self._maybe_flush()
+            self._ensure(user_id)
+            cursor = self._conn.execute(
+                "UPDATE credits SET tokens_left = tokens_left - ? WHERE user_id = ? AND tokens_left >= ?",
+                (tokens, user_id, tokens),
+            )
+            return cursor.rowcount == 1
+
+    def refund(self, user_id: str, tokens: int):
+        with self._lock:
+            self._pending_refunds[user_id] = self._pending_refunds.get(user_id, 0) + tokens
+            self._pending_count += 1
+            self._maybe_flush()
+
+    def get_name(self, user_id: str) -> str | None:
+        with self._lock:
+            if user_id not in self._known_names:
+                row = self._conn.execute(
+                    "SELECT name FROM credits WHERE user_id = ?", (user_id,)
+                ).fetchone()
+                self._known_names[user_id] = row[0] if row else None
+            return self._known_names[user_id]
+
+    def set_name(self, user_id: str, name: str):
+        with self._lock:
+            if self._known_names.get(user_id) == name:
+                return
+            self._known_names[user_id] = name
+            self._pending_names[user_id] = name
+            self._pending_count += 1
+            self._maybe_flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        self.flush()
+        self._conn.close()
+
+
+def create_ledger(backend: str = CREDIT_LEDGER) -> CreditLedger:
+    if backend == "sqlite":
+        return SQLiteLedger()
+    if backend == "memory":
+        return MemoryLedger()
+    raise ValueError(f"Unknown credit ledger backend: {backend}")
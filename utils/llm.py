@@ -0,0 +1,102 @@
+import os
+import httpx
+
+from utils.settings import get_settings
+
+# Connection pool shared by every router in the process.
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "20"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "10"))
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "1") == "1"
+# Retries are handled by utils.scheduler so they respect its concurrency limit.
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "0"))
+
+# Read timeout (seconds) per endpoint, overridable with LLM_TIMEOUT_<NAME>.
+ENDPOINT_TIMEOUTS = {
+    "default": 60.0,
+    "career": 60.0,
+    "cv": 120.0,
+    "ask": 30.0,
+    "quiz": 60.0,
+    "summarize": 120.0,
+    "translate": 90.0,
+}
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _endpoint_timeout(endpoint: str) -> float:
+    default = ENDPOINT_TIMEOUTS.get(endpoint, ENDPOINT_TIMEOUTS["default"])
+    return float(os.getenv(f"LLM_TIMEOUT_{endpoint.upper()}", default))
+
+
+_http_client: httpx.AsyncClient | None = None
+_external_client = None
+_run_configs: dict = {}
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """The connection pool shared by every router, created on first use."""
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            http2=LLM_HTTP2 and _http2_available(),
+            limits=httpx.Limits(
+                max_connections=LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_MAX_KEEPALIVE,
+                keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(ENDPOINT_TIMEOUTS["default"], connect=LLM_CONNECT_TIMEOUT),
+        )
+    return _http_client
+
+
+def _get_external_client():
+    global _external_client
+    if _external_client is None:
+        # The OpenAI SDK is slow to import, so it is loaded on the first model call.
+        from openai import AsyncOpenAI
+
+        settings = get_settings()
+        if not settings.gemini_api_key:
+            raise RuntimeError("GEMINI_API_KEY not set in .env file")
+        _external_client = AsyncOpenAI(
+            api_key=settings.gemini_api_key,
+            base_url=settings.gemini_base_url,
+            http_client=get_http_client(),
+            max_retries=LLM_MAX_RETRIES,
+        )
+    return _external_client
+
+
+def get_client(endpoint: str = "default"):
+    """AsyncOpenAI client bound to the shared pool with the endpoint's timeout applied."""
+    timeout = httpx.Timeout(_endpoint_timeout(endpoint), connect=LLM_CONNECT_TIMEOUT)
+    return _get_external_client().with_options(timeout=timeout)
+
+
+def get_run_config(endpoint: str = "default"):
+    """RunConfig for an endpoint. All configs share one HTTP connection pool."""
+    config = _run_configs.get(endpoint)
+    if config is None:
+        from agents import OpenAIChatCompletionsModel, RunConfig
+
+        model = OpenAIChatCompletionsModel(
+            model=get_settings().gemini_model,
+            openai_client=get_client(endpoint),
+        )
+        config = RunConfig(model=model, tracing_disabled=True)
+        _run_configs[endpoint] = config
+    return config
+
+
+async def close_client():
+    if _http_client is not None:
+        await _http_client.aclose()
@@ -0,0 +1,298 @@
+import asyncio
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.5"))
+
+# Seconds. Upstream calls and whole requests span ms to minutes.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+LOCAL_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+_registry: list["_Metric"] = []
+_collectors: list[Callable[[], list[str]]] = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labels
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    @abstractmethod
+    def _samples(self) -> list[str]:
+        ...
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self._samples()]
+
+
+class Counter(_Metric):
+    """Monotonic counter. Label values are passed positionally, in `labels` order."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        super().__init__(name, help, labels)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        super().__init__(name, help, labels)
+        self._values: dict[tuple, float] = {}
+
+    def set(self, value: float, *labels):
+        self._values[labels] = value
+
+    def _samples(self) -> list[str]:
+        return [f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in list(self._values.items())]
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram; `observe` is one bisect and two additions."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (+Inf last), sum]
+        self._values: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels):
+        if not METRICS_ENABLED:
+            return
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def count(self, *labels) -> int:
+        entry = self._values.get(labels)
+        return sum(entry[0]) if entry else 0
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = [(k, list(v[0]), v[1]) for k, v in self._values.items()]
+        lines = []
+        for labels, counts, total in items:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total!r}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+def register_collector(fn: Callable[[], list[str]]):
+    """Add a function returning extra exposition lines, evaluated at scrape time."""
+    _collectors.append(fn)
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    for collect in _collectors:
+        lines.extend(collect())
+    return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Request time until the last body chunk is sent, by route template.",
+    ("method", "route", "status"),
+)
+UPSTREAM_LATENCY = Histogram(
+    "upstream_run_duration_seconds",
+    "Time spent inside Runner.run / run_streamed, by agent.",
+    ("agent", "mode"),
+)
+UPSTREAM_TOKENS = Counter(
+    "upstream_tokens_total",
+    "Model tokens reported by the upstream, by agent and direction.",
+    ("agent", "kind"),
+)
+UPSTREAM_ERRORS = Counter(
+    "upstream_errors_total",
+    "Failed upstream runs, by agent and exception type.",
+    ("agent", "error"),
+)
+UPSTREAM_HEDGES = Counter(
+    "upstream_hedges_total",
+    "Hedged upstream calls by route and result: won/lost (the hedge answered "
+    "first or not), failed (both failed) or over_budget (hedge not sent).",
+    ("route", "result"),
+)
+LOCAL_WORK = Histogram(
+    "local_work_duration_seconds",
+    "CPU-bound work done in the app (formatting, rendering, TTS, language detection).",
+    ("op",),
+    buckets=LOCAL_BUCKETS,
+)
+CREDIT_TOKENS = Counter(
+    "credit_tokens_total",
+    "Study-credit tokens moved through the ledger.",
+    ("kind",),
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Cache lookups by cache and result (hit/miss).",
+    ("cache", "result"),
+)
+LOOP_LAG = Histogram(
+    "event_loop_lag_seconds",
+    "How late the event loop woke a sleeping task.",
+    buckets=LOCAL_BUCKETS,
+)
+LOOP_LAG_LAST = Gauge("event_loop_lag_last_seconds", "Most recent event-loop lag sample.")
+
+
+def timed(op: str):
+    """Decorator recording a function's duration under LOCAL_WORK{op}."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                LOCAL_WORK.observe(time.perf_counter() - start, op)
+        return wrapper
+    return decorator
+
+
+def cache_lookup(cache: str, hit: bool):
+    CACHE_REQUESTS.inc(cache, "hit" if hit else "miss")
+
+
+def record_usage(agent: str, usage):
+    """Token counts from a run's context_wrapper.usage."""
+    if usage is None:
+        return
+    UPSTREAM_TOKENS.inc(agent, "input", amount=usage.input_tokens or 0)
+    UPSTREAM_TOKENS.inc(agent, "output", amount=usage.output_tokens or 0)
+
+
+def run_usage(result):
+    wrapper = getattr(result, "context_wrapper", None)
+    return getattr(wrapper, "usage", None)
+
+
+async def monitor_loop_lag(interval: float = LOOP_LAG_INTERVAL):
+    """Sleep `interval` repeatedly and record how late each wake-up was."""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - start - interval)
+        LOOP_LAG.observe(lag)
+        LOOP_LAG_LAST.set(lag)
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware timing each HTTP request until its final body
+    chunk (so streamed responses count fully). Requests are labelled with the
+    matched route template, never the raw path, to keep cardinality bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        status = 500
+        recorded = False
+
+        def record():
+            nonlocal recorded
+            if recorded:
+                return
+            recorded = True
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            REQUEST_LATENCY.observe(time.perf_counter() - start, scope["method"], path, str(status))
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                record()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            record()
@@ -0,0 +1,175 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import time
+from collections import Counter
+from typing import Awaitable, Callable
+
+from utils.metrics import cache_lookup
+
+logger = logging.getLogger(__name__)
+
+QUIZ_POOL_MAX = int(os.getenv("QUIZ_POOL_MAX", "60"))
+QUIZ_POOL_LOW = int(os.getenv("QUIZ_POOL_LOW", "15"))
+QUIZ_POOL_BATCH = int(os.getenv("QUIZ_POOL_BATCH", "10"))
+QUIZ_POOL_MAX_TOPICS = int(os.getenv("QUIZ_POOL_MAX_TOPICS", "500"))
+# A pool also gets a new batch after serving this many questions, or when
+# its last batch is older than QUIZ_POOL_MAX_AGE seconds.
+QUIZ_POOL_REFRESH_SERVED = int(os.getenv("QUIZ_POOL_REFRESH_SERVED", "100"))
+QUIZ_POOL_MAX_AGE = float(os.getenv("QUIZ_POOL_MAX_AGE", "3600"))
+QUIZ_WARM_COUNT = int(os.getenv("QUIZ_WARM_COUNT", "10"))
+QUIZ_WARM_TOPICS = [t for t in os.getenv("QUIZ_WARM_TOPICS", "").split(",") if t.strip()]
+QUIZ_POPULAR_PATH = os.getenv("QUIZ_POPULAR_PATH", os.path.join(".cache", "quiz_popular.json"))
+
+_NON_WORD = re.compile(r"[^\w\s]+")
+
+
+def normalize_topic(topic: str) -> str:
+    return " ".join(_NON_WORD.sub(" ", topic.lower()).split())
+
+
+def _question_key(question: dict) -> str:
+    return normalize_topic(str(question.get("question", "")))
+
+
+class QuizPool:
+    """
+    Per-topic pools of generated questions.
+    Requests are served by sampling from the pool; when a pool drops below
+    `low`, has served `refresh_served` questions or is older than `max_age`,
+    a background task asks `generate` for another batch, and the oldest
+    questions make room once the pool is full. Popularity of at most
+    `max_topics` topics is kept so the most requested can be warmed at startup.
+    """
+
+    def __init__(
+        self,
+        generate: Callable[[str, int], Awaitable[list[dict]]],
+        max_size: int = QUIZ_POOL_MAX,
+        low: int = QUIZ_POOL_LOW,
+        batch: int = QUIZ_POOL_BATCH,
+        max_topics: int = QUIZ_POOL_MAX_TOPICS,
+        refresh_served: int = QUIZ_POOL_REFRESH_SERVED,
+        max_age: float = QUIZ_POOL_MAX_AGE,
+    ):
+        self.generate = generate
+        self.max_size = max_size
+        self.low = low
+        self.batch = batch
+        self.max_topics = max_topics
+        self.refresh_served = refresh_served
+        self.max_age = max_age
+        self.pools: dict[str, list[dict]] = {}
+        self.popularity: Counter[str] = Counter()
+        self._served: dict[str, int] = {}
+        self._refreshed: dict[str, float] = {}
+        self._refills: dict[str, asyncio.Task] = {}
+
+    def touch(self, key: str):
+        """Count a request for key; popularity is pruned to max_topics once it doubles."""
+        self.popularity[key] += 1
+        if len(self.popularity) > 2 * self.max_topics:
+            self._prune_popularity()
+
+    def _prune_popularity(self):
+        self.popularity = Counter(dict(self.popularity.most_common(self.max_topics)))
+
+    def add(self, key: str, questions: list[dict]):
+        pool = self.pools.setdefault(key, [])
+        seen = {_question_key(q) for q in pool}
+        for question in questions:
+            qkey = _question_key(question)
+            if qkey and qkey not in seen:
+                pool.append(question)
+                seen.add(qkey)
+        if len(pool) > self.max_size:
+            del pool[:len(pool) - self.max_size]
+        self._served[key] = 0
+        self._refreshed[key] = time.monotonic()
+        while len(self.pools) > self.max_topics:
+            coldest = min(self.pools, key=lambda k: self.popularity[k])
+            del self.pools[coldest]
+            self._served.pop(coldest, None)
+            self._refreshed.pop(coldest, None)
+
+    def sample(self, key: str, count: int) -> list[dict] | None:
+        """`count` random questions with shuffled options, or None if the pool is too small."""
+        pool = self.pools.get(key, [])
+        if len(pool) < count:
+            return None
+        questions = []
+        for question in random.sample(pool, count):
+            question = dict(question)
+            options = list(question.get("options", []))
+            random.shuffle(options)
+            question["options"] = options
+            questions.append(question)
+        self._served[key] = self._served.get(key, 0) + count
+        return questions
+
+    def _refill_needed(self, key: str, count: int) -> bool:
+        if len(self.pools.get(key, [])) < max(self.low, count):
+            return True
+        if self._served.get(key, 0) >= self.refresh_served:
+            return True
+        return time.monotonic() - self._refreshed.get(key, 0.0) > self.max_age
+
+    def maybe_refill(self, key: str, topic: str, count: int):
+        if self._refill_needed(key, count):
+            self.schedule_refill(key, topic)
+
+    def schedule_refill(self, key: str, topic: str):
+        if key in self._refills:
+            return
+        task = asyncio.create_task(self._refill(key, topic))
+        self._refills[key] = task
+        task.add_done_callback(lambda _: self._refills.pop(key, None))
+
+    async def _refill(self, key: str, topic: str):
+        try:
+            self.add(key, await self.generate(topic, self.batch))
+        except Exception as e:
+            logger.warning(f"Quiz pool refill failed for {key!r}: {e}")
+
+    async def get(self, topic: str, count: int) -> list[dict]:
+        key = normalize_topic(topic)
+        self.touch(key)
+
+        questions = self.sample(key, count)
+        cache_lookup("quiz_pool", questions is not None)
+        if questions is None:
+            # Cold topic: generate on the request path and keep the result.
+            generated = await self.generate(topic, max(count, self.batch))
+            self.add(key, generated)
+            questions = self.sample(key, count) or generated[:count]
+
+        self.maybe_refill(key, topic, count)
+        return questions
+
+    def load_popularity(self, path: str = QUIZ_POPULAR_PATH):
+        try:
+            with open(path, encoding="utf-8") as f:
+                self.popularity.update(json.load(f))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        if len(self.popularity) > self.max_topics:
+            self._prune_popularity()
+
+    def save_popularity(self, path: str = QUIZ_POPULAR_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(dict(self.popularity.most_common(self.max_topics)), f)
+
+    def warm(self, topics: list[str] = QUIZ_WARM_TOPICS, count: int = QUIZ_WARM_COUNT):
+        """Start background refills for configured and most popular topics (see load_popularity)."""
+        wanted = [t.strip() for t in topics] + [k for k, _ in self.popularity.most_common(count)]
+        for topic in dict.fromkeys(wanted):
+            self.schedule_refill(normalize_topic(topic), topic)
+
+    async def close(self):
+        for task in list(self._refills.values()):
+            task.cancel()
+        self.save_popularity()
@@ -0,0 +1,116 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import TYPE_CHECKING
+
+from utils.hedging import hedger
+from utils.metrics import UPSTREAM_ERRORS, UPSTREAM_LATENCY, record_usage, run_usage
+from utils.scheduler import ANALYSIS, scheduler
+
+if TYPE_CHECKING:
+    from agents import Agent, RunConfig
+
+SINGLEFLIGHT_ENABLED = os.getenv("SINGLEFLIGHT_ENABLED", "1") == "1"
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key into one.
+    The first caller starts the call; later callers with the same key await
+    the same task and get its result or exception. Waiters are shielded, so
+    a cancelled waiter does not cancel the shared call.
+    """
+
+    def __init__(self):
+        self._calls: dict[str, asyncio.Task] = {}
+
+    def _done(self, key: str, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved even if every waiter went away.
+            task.exception()
+
+    async def do(self, key: str, fn):
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        return await asyncio.shield(task)
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+
+_singleflight = SingleFlight()
+
+
+async def _timed_run(agent: "Agent", input, run_config: "RunConfig | None"):
+    """Runner.run, recording upstream time and token usage per agent."""
+    from agents import Runner
+
+    start = time.perf_counter()
+    try:
+        result = await Runner.run(agent, input, run_config=run_config)
+    except asyncio.CancelledError:
+        # Not a full upstream call (client gone or a lost hedge).
+        raise
+    except Exception as e:
+        UPSTREAM_ERRORS.inc(agent.name, type(e).__name__)
+        UPSTREAM_LATENCY.observe(time.perf_counter() - start, agent.name, "run")
+        raise
+    UPSTREAM_LATENCY.observe(time.perf_counter() - start, agent.name, "run")
+    record_usage(agent.name, run_usage(result))
+    return result
+
+
+def _normalize_input(input) -> str:
+    if isinstance(input, str):
+        return " ".join(input.split())
+    return json.dumps(input, sort_keys=True, default=str)
+
+
+def run_key(agent: "Agent", input, run_config: "RunConfig | None") -> str:
+    """Hash of everything that determines a run's output."""
+    model = run_config.model if run_config else agent.model
+    parts = [
+        agent.name,
+        str(agent.instructions),
+        getattr(agent.output_type, "__name__", str(agent.output_type)),
+        repr(agent.model_settings),
+        getattr(model, "model", str(model)),
+        repr(run_config.model_settings) if run_config else "",
+        _normalize_input(input),
+    ]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+async def run_agent(
+    agent: "Agent",
+    input,
+    run_config: "RunConfig | None" = None,
+    priority: int = ANALYSIS,
+    coalesce: bool = SINGLEFLIGHT_ENABLED,
+    hedge: str | None = None,
+):
+    """
+    Runner.run through the upstream scheduler, with identical in-flight calls
+    coalesced into one upstream request. Every router should go through this
+    instead of Runner.run.
+    With `hedge` set to a route name and HEDGE_ENABLED, slow calls get a
+    second, racing request (see utils.hedging).
+    """
+    def attempt():
+        return scheduler.run(lambda: _timed_run(agent, input, run_config), priority)
+
+    def call():
+        if hedge is not None and hedger is not None:
+            return hedger.run(hedge, attempt)
+        return attempt()
+
+    if not coalesce:
+        return await call()
+    return await _singleflight.do(run_key(agent, input, run_config), call)
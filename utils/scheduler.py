@@ -0,0 +1,224 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+
+from utils.metrics import register_collector
+
+logger = logging.getLogger(__name__)
+
+# Priority classes, lower runs first.
+INTERACTIVE = 0  # chat
+ANALYSIS = 1     # CV analysis, quizzes
+BULK = 2         # summarization, translation, background work
+PRIORITY_NAMES = {INTERACTIVE: "interactive", ANALYSIS: "analysis", BULK: "bulk"}
+
+SCHED_INITIAL_LIMIT = float(os.getenv("SCHED_INITIAL_LIMIT", "16"))
+SCHED_MIN_LIMIT = float(os.getenv("SCHED_MIN_LIMIT", "1"))
+SCHED_MAX_LIMIT = float(os.getenv("SCHED_MAX_LIMIT", "64"))
+SCHED_DECREASE_FACTOR = float(os.getenv("SCHED_DECREASE_FACTOR", "0.5"))
+SCHED_MAX_RETRIES = int(os.getenv("SCHED_MAX_RETRIES", "3"))
+SCHED_BACKOFF_BASE = float(os.getenv("SCHED_BACKOFF_BASE", "0.5"))
+SCHED_BACKOFF_MAX = float(os.getenv("SCHED_BACKOFF_MAX", "20"))
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+def _status(error: Exception) -> int | None:
+    from openai import APIStatusError
+
+    return getattr(error, "status_code", None) if isinstance(error, APIStatusError) else None
+
+
+def retry_after(error: Exception) -> float | None:
+    """Seconds from a Retry-After / retry-after-ms header, if the error carries one."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        if "retry-after" in headers:
+            return float(headers["retry-after"])
+    except ValueError:
+        return None
+    return None
+
+
+class UpstreamScheduler:
+    """
+    Admission control for upstream model calls.
+    Calls wait in a priority queue until the number in flight is below an
+    AIMD limit: +1/limit per success, x SCHED_DECREASE_FACTOR on a 429 (at
+    most once per cooldown). Retryable failures are retried honoring
+    Retry-After, otherwise with jittered exponential backoff.
+    """
+
+    def __init__(
+        self,
+        initial_limit: float = SCHED_INITIAL_LIMIT,
+        min_limit: float = SCHED_MIN_LIMIT,
+        max_limit: float = SCHED_MAX_LIMIT,
+        max_retries: int = SCHED_MAX_RETRIES,
+    ):
+        self.limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_retries = max_retries
+        self.in_flight = 0
+        self._queue: list[tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._last_decrease = 0.0
+        self.queued = {name: 0 for name in PRIORITY_NAMES.values()}
+        self.wait_seconds = {name: 0.0 for name in PRIORITY_NAMES.values()}
+        self.max_wait_seconds = {name: 0.0 for name in PRIORITY_NAMES.values()}
+        self.throttled = 0
+        self.retries = 0
+
+    def _has_capacity(self) -> bool:
+        return self.in_flight < max(1, int(self.limit))
+
+    def _wake(self):
+        while self._queue and self._has_capacity():
+            _, _, future = heapq.heappop(self._queue)
+            if not future.done():
+                self.in_flight += 1
+                future.set_result(None)
+
+    async def acquire(self, priority: int = ANALYSIS):
+        name = PRIORITY_NAMES.get(priority, "analysis")
+        if not self._queue and self._has_capacity():
+            self.in_flight += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, next(self._seq), future))
+        self.queued[name] += 1
+        start = time.monotonic()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Slot was granted just as we were cancelled; hand it back.
+                self.release()
+            raise
+        finally:
+            self.queued[name] -= 1
+            waited = time.monotonic() - start
+            # Exponentially weighted average of queue wait per class.
+            self.wait_seconds[name] = 0.8 * self.wait_seconds[name] + 0.2 * waited
+            self.max_wait_seconds[name] = max(self.max_wait_seconds[name], waited)
+
+    def release(self):
+        self.in_flight -= 1
+        self._wake()
+
+    def on_success(self):
+        self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        self._wake()
+
+    def on_throttled(self):
+        self.throttled += 1
+        now = time.monotonic()
+        # One decrease per burst: calls already in flight will 429 too.
+        if now - self._last_decrease > 1.0:
+            self.limit = max(self.min_limit, self.limit * SCHED_DECREASE_FACTOR)
+            self._last_decrease = now
+            logger.warning(f"Upstream throttled, concurrency limit now {self.limit:.1f}")
+
+    @asynccontextmanager
+    async def slot(self, priority: int = ANALYSIS):
+        """Hold one upstream slot (used for streamed runs, which are not retried)."""
+        await self.acquire(priority)
+        try:
+            yield
+        except Exception as e:
+            if _status(e) == 429:
+                self.on_throttled()
+            raise
+        else:
+            self.on_success()
+        finally:
+            self.release()
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        delay = retry_after(error)
+        if delay is None:
+            delay = random.uniform(0, min(SCHED_BACKOFF_MAX, SCHED_BACKOFF_BASE * 2 ** attempt))
+        else:
+            delay += random.uniform(0, SCHED_BACKOFF_BASE)
+        return min(delay, SCHED_BACKOFF_MAX)
+
+    async def run(self, fn, priority: int = ANALYSIS):
+        """Run `fn()` (an upstream call) under the limit, retrying retryable failures."""
+        attempt = 0
+        while True:
+            await self.acquire(priority)
+            try:
+                result = await fn()
+            except Exception as e:
+                status = _status(e)
+                if status == 429:
+                    self.on_throttled()
+                if status not in RETRYABLE_STATUS or attempt >= self.max_retries:
+                    raise
+                error = e
+            else:
+                self.on_success()
+                return result
+            finally:
+                self.release()
+
+            attempt += 1
+            self.retries += 1
+            await asyncio.sleep(self._backoff(attempt, error))
+
+    def stats(self) -> dict:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queue_depth": dict(self.queued),
+            "wait_seconds_avg": {k: round(v, 4) for k, v in self.wait_seconds.items()},
+            "wait_seconds_max": {k: round(v, 4) for k, v in self.max_wait_seconds.items()},
+            "throttled": self.throttled,
+            "retries": self.retries,
+        }
+
+
+scheduler = UpstreamScheduler()
+
+
+def _metric_lines() -> list[str]:
+    """Scheduler state in exposition format, read at scrape time."""
+    lines = [
+        "# HELP upstream_concurrency_limit Current AIMD limit on concurrent upstream calls.",
+        "# TYPE upstream_concurrency_limit gauge",
+        f"upstream_concurrency_limit {scheduler.limit}",
+        "# HELP upstream_in_flight Upstream calls currently holding a slot.",
+        "# TYPE upstream_in_flight gauge",
+        f"upstream_in_flight {scheduler.in_flight}",
+        "# HELP upstream_queue_depth Calls waiting for a slot, by priority class.",
+        "# TYPE upstream_queue_depth gauge",
+    ]
+    lines += [f'upstream_queue_depth{{priority="{k}"}} {v}' for k, v in scheduler.queued.items()]
+    lines += [
+        "# HELP upstream_queue_wait_seconds Moving average of queue wait, by priority class.",
+        "# TYPE upstream_queue_wait_seconds gauge",
+    ]
+    lines += [f'upstream_queue_wait_seconds{{priority="{k}"}} {v}' for k, v in scheduler.wait_seconds.items()]
+    lines += [
+        "# HELP upstream_throttled_total Upstream 429 responses.",
+        "# TYPE upstream_throttled_total counter",
+        f"upstream_throttled_total {scheduler.throttled}",
+        "# HELP upstream_retries_total Upstream calls retried by the scheduler.",
+        "# TYPE upstream_retries_total counter",
+        f"upstream_retries_total {scheduler.retries}",
+    ]
+    return lines
+
+
+register_collector(_metric_lines)
@@ -0,0 +1,204 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Awaitable, Callable
+
+from utils.tokens import count_tokens
+
+# "memory" (single process) or "sqlite" (persistent, shared between workers).
+SESSION_STORE = os.getenv("SESSION_STORE", "memory")
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "sessions.db")
+SESSION_TTL = float(os.getenv("SESSION_TTL", str(24 * 3600)))
+SESSION_MAX_USERS = int(os.getenv("SESSION_MAX_USERS", "10000"))
+# History above this many tokens is compacted into the rolling summary,
+# keeping the most recent SESSION_KEEP_TOKENS verbatim.
+SESSION_TOKEN_BUDGET = int(os.getenv("SESSION_TOKEN_BUDGET", "3000"))
+SESSION_KEEP_TOKENS = int(os.getenv("SESSION_KEEP_TOKENS", "1500"))
+
+
+@dataclass
+class Session:
+    user_id: str
+    summary: str = ""
+    turns: list[dict] = field(default_factory=list)
+    updated: float = field(default_factory=time.time)
+
+    def add_turn(self, message: str, reply: str):
+        self.turns.append({"role": "user", "content": message})
+        self.turns.append({"role": "assistant", "content": reply})
+        self.updated = time.time()
+
+    def history_tokens(self) -> int:
+        return sum(count_tokens(t["content"]) for t in self.turns)
+
+    def to_input(self, message: str) -> list[dict]:
+        """Agent input: rolling summary, recent turns, then the new message."""
+        items = []
+        if self.summary:
+            items.append({
+                "role": "system",
+                "content": f"Summary of the earlier conversation with this user:\n{self.summary}",
+            })
+        items.extend(self.turns)
+        items.append({"role": "user", "content": message})
+        return items
+
+
+def _turns_to_compact(turns: list[dict]) -> int:
+    """Number of leading turns to fold so the rest fits in SESSION_KEEP_TOKENS."""
+    keep, kept_tokens = len(turns), 0
+    while keep > 0:
+        size = count_tokens(turns[keep - 1]["content"])
+        if kept_tokens + size > SESSION_KEEP_TOKENS:
+            break
+        kept_tokens += size
+        keep -= 1
+    # Compact whole user/assistant pairs.
+    return keep + keep % 2
+
+
+class SessionStore(ABC):
+    def __init__(self, ttl: float = SESSION_TTL):
+        self.ttl = ttl
+
+    def _expired(self, session: Session) -> bool:
+        return time.time() - session.updated > self.ttl
+
+    @abstractmethod
+    def load(self, user_id: str) -> Session:
+        """The user's session, or a fresh one if missing or expired."""
+
+    @abstractmethod
+    def save(self, session: Session):
+        ...
+
+    @abstractmethod
+    def delete(self, user_id: str):
+        ...
+
+    def close(self):
+        pass
+
+
+class MemorySessionStore(SessionStore):
+    def __init__(self, max_users: int = SESSION_MAX_USERS, **kwargs):
+        super().__init__(**kwargs)
+        self.max_users = max_users
+        self._sessions: OrderedDict[str, Session] = OrderedDict()
+
+    def load(self, user_id: str) -> Session:
+        session = self._sessions.get(user_id)
+        if session is None or self._expired(session):
+            self._sessions.pop(user_id, None)
+            return Session(user_id=user_id)
+        self._sessions.move_to_end(user_id)
+        return session
+
+    def save(self, session: Session):
+        self._sessions[session.user_id] = session
+        self._sessions.move_to_end(session.user_id)
+        while len(self._sessions) > self.max_users:
+            self._sessions.popitem(last=False)
+
+    def delete(self, user_id: str):
+        self._sessions.pop(user_id, None)
+
+
+class SQLiteSessionStore(SessionStore):
+    """Sessions as JSON rows in a WAL-mode SQLite file; expired rows are purged periodically."""
+
+    PURGE_EVERY = 100
+
+    def __init__(self, path: str = SESSION_DB_PATH, **kwargs):
+        super().__init__(**kwargs)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "user_id TEXT PRIMARY KEY, "
+            "data TEXT NOT NULL, "
+            "updated REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated)")
+        self._saves = 0
+
+    def load(self, user_id: str) -> Session:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM sessions WHERE user_id = ? AND updated > ?",
+                (user_id, time.time() - self.ttl),
+            ).fetchone()
+        if row is None:
+            return Session(user_id=user_id)
+        return Session(**json.loads(row[0]))
+
+    def save(self, session: Session):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions (user_id, data, updated) VALUES (?, ?, ?)",
+                (session.user_id, json.dumps(asdict(session), ensure_ascii=False), session.updated),
+            )
+            self._saves += 1
+            if self._saves % self.PURGE_EVERY == 0:
+                self._conn.execute("DELETE FROM sessions WHERE updated <= ?", (time.time() - self.ttl,))
+
+    def delete(self, user_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE user_id = ?", (user_id,))
+
+    def close(self):
+        self._conn.close()
+
+
+def create_session_store(backend: str = SESSION_STORE) -> SessionStore:
+    if backend == "sqlite":
+        return SQLiteSessionStore()
+    if backend == "memory":
+        return MemorySessionStore()
+    raise ValueError(f"Unknown session store backend: {backend}")
+
+
+_compacting: set[str] = set()
+
+
+async def compact_session(
+    store: SessionStore,
+    user_id: str,
+    summarize: Callable[[str, list[dict]], Awaitable[str]],
+):
+    """
+    If the user's history is over SESSION_TOKEN_BUDGET, fold the oldest turns
+    into the rolling summary so only the last SESSION_KEEP_TOKENS stay
+    verbatim. `summarize(previous_summary, turns)` returns the new summary.
+    Safe to run in the background: the result is only saved if no other
+    request changed the compacted part in the meantime.
+    """
+    if user_id in _compacting:
+        return
+    _compacting.add(user_id)
+    try:
+        session = store.load(user_id)
+        if session.history_tokens() <= SESSION_TOKEN_BUDGET:
+            return
+        count = _turns_to_compact(session.turns)
+        old, previous_summary = session.turns[:count], session.summary
+        if not old:
+            return
+
+        summary = await summarize(previous_summary, old)
+
+        current = store.load(user_id)
+        if current.summary != previous_summary or current.turns[:count] != old:
+            return
+        current.summary = summary
+        del current.turns[:count]
+        store.save(current)
+    finally:
+        _compacting.discard(user_id)
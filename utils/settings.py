@@ -0,0 +1,30 @@
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+
+from dotenv import load_dotenv
+
+
+@dataclass(frozen=True)
+class Settings:
+    gemini_api_key: str | None
+    gemini_base_url: str
+    gemini_model: str
+    cors_origins: tuple[str, ...]
+    # Import heavy modules and build clients in the background at startup.
+    warmup: bool
+
+
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    """Load .env once per process and read the app-wide settings."""
+    load_dotenv()
+    return Settings(
+        gemini_api_key=os.getenv("GEMINI_API_KEY") or None,
+        gemini_base_url=os.getenv(
+            "GEMINI_BASE_URL", "https://generativelanguage.googleapis.com/v1beta/openai/"
+        ),
+        gemini_model=os.getenv("GEMINI_MODEL", "gemini-2.0-flash"),
+        cors_origins=tuple(o.strip() for o in os.getenv("CORS_ORIGINS", "*").split(",") if o.strip()),
+        warmup=os.getenv("WARMUP_ON_START", "0") == "1",
+    )
@@ -0,0 +1,66 @@
+import asyncio
+import json
+import time
+from typing import AsyncIterator
+
+from fastapi.responses import StreamingResponse
+from utils.metrics import UPSTREAM_ERRORS, UPSTREAM_LATENCY, record_usage, run_usage
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+}
+
+
+def sse_event(data: dict, event: str | None = None) -> str:
+    """Encode one server-sent event."""
+    payload = json.dumps(data, ensure_ascii=False)
+    if event:
+        return f"event: {event}\ndata: {payload}\n\n"
+    return f"data: {payload}\n\n"
+
+
+class SSEResponse(StreamingResponse):
+    """
+    StreamingResponse that closes its event generator when the response
+    ends, so cleanup in the generator runs even when the client disconnects
+    (Starlette otherwise leaves it suspended until garbage collection).
+    """
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            aclose = getattr(self.body_iterator, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+
+def sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    return SSEResponse(events, media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+async def stream_text_deltas(result) -> AsyncIterator[str]:
+    """Yield text deltas from a RunResultStreaming as the model produces them."""
+    from openai.types.responses import ResponseTextDeltaEvent
+
+    agent = result.current_agent.name
+    start = time.perf_counter()
+    try:
+        async for event in result.stream_events():
+            if event.type == "raw_response_event" and isinstance(event.data, ResponseTextDeltaEvent):
+                if event.data.delta:
+                    yield event.data.delta
+        # stream_events() ends quietly when cancelled (e.g. the client went
+        # away); re-raise so callers do not take it for a finished stream.
+        task = asyncio.current_task()
+        if task is not None and task.cancelling():
+            raise asyncio.CancelledError()
+    except Exception as e:
+        UPSTREAM_ERRORS.inc(agent, type(e).__name__)
+        raise
+    finally:
+        UPSTREAM_LATENCY.observe(time.perf_counter() - start, agent, "stream")
+        record_usage(agent, run_usage(result))
+        if not result.is_complete:
+            result.cancel()
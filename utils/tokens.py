@@ -0,0 +1,170 @@
+import asyncio
+import logging
+import os
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+TOKEN_ENCODING = os.getenv("TOKEN_ENCODING", "cl100k_base")
+# Used only when the tiktoken encoding cannot be loaded (e.g. offline).
+APPROX_CHARS_PER_TOKEN = 4
+# Generous upper bound on characters per token, for reading enough text
+# ahead of truncate_tokens().
+MAX_CHARS_PER_TOKEN = 10
+# A failed encoder load is retried after this many seconds, doubling up to
+# ENCODER_RETRY_MAX.
+ENCODER_RETRY_MIN = 30.0
+ENCODER_RETRY_MAX = 1800.0
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_END = re.compile(r"[.!?۔؟](?=\s)")
+
+
+_encoder = None
+_failures = 0
+_retry_at = 0.0
+_load_lock = threading.Lock()
+_background_load: threading.Thread | None = None
+
+
+def load_encoder():
+    """
+    Load the tiktoken encoder (blocking: it may download the BPE file).
+    On failure the approximation is used and the load is retried once the
+    backoff has passed. Returns the encoder or None.
+    """
+    global _encoder, _failures, _retry_at
+    with _load_lock:
+        if _encoder is not None or time.monotonic() < _retry_at:
+            return _encoder
+        try:
+            import tiktoken
+
+            _encoder = tiktoken.get_encoding(TOKEN_ENCODING)
+            _failures = 0
+        except Exception as e:
+            _failures += 1
+            delay = min(ENCODER_RETRY_MAX, ENCODER_RETRY_MIN * 2 ** (_failures - 1))
+            _retry_at = time.monotonic() + delay
+            logger.warning(f"tiktoken encoding {TOKEN_ENCODING} unavailable, approximating for {delay:.0f}s: {e}")
+        return _encoder
+
+
+def _load_in_background():
+    global _background_load
+    if (_background_load is not None and _background_load.is_alive()) or time.monotonic() < _retry_at:
+        return
+    _background_load = threading.Thread(target=load_encoder, name="tiktoken-load", daemon=True)
+    _background_load.start()
+
+
+def get_encoder():
+    """
+    tiktoken encoder, or None while it is unavailable. Never loads on a
+    running event loop: there a background load is started instead.
+    """
+    if _encoder is not None:
+        return _encoder
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return load_encoder()
+    _load_in_background()
+    return None
+
+
+def count_tokens(text: str) -> int:
+    encoder = get_encoder()
+    if encoder is None:
+        return -(-len(text) // APPROX_CHARS_PER_TOKEN)
+    return len(encoder.encode(text, disallowed_special=()))
+
+
+def _hard_split(text: str, max_tokens: int) -> list[str]:
+    encoder = get_encoder()
+    if encoder is None:
+        step = max_tokens * APPROX_CHARS_PER_TOKEN
+        return [text[i:i + step] for i in range(0, len(text), step)]
+    tokens = encoder.encode(text, disallowed_special=())
+    return [encoder.decode(tokens[i:i + max_tokens]) for i in range(0, len(tokens), max_tokens)]
+
+
+def _pack(parts: list[str], separator: str, max_tokens: int, split_large) -> list[str]:
+    chunks: list[str] = []
+    current: list[str] = []
+    current_tokens = 0
+
+    for part in parts:
+        part = part.strip()
+        if not part:
+            continue
+        size = count_tokens(part)
+        if size > max_tokens:
+            if current:
+                chunks.append(separator.join(current))
+                current, current_tokens = [], 0
+            chunks.extend(split_large(part))
+            continue
+        if current and current_tokens + size > max_tokens:
+            chunks.append(separator.join(current))
+            current, current_tokens = [], 0
+        current.append(part)
+        current_tokens += size
+
+    if current:
+        chunks.append(separator.join(current))
+    return chunks
+
+
+def split_by_tokens(text: str, max_tokens: int) -> list[str]:
+    """
+    Split text into chunks of at most max_tokens tokens.
+    Whole paragraphs are packed together where possible; a paragraph larger
+    than max_tokens is split by lines, and a line larger than that is cut at
+    token boundaries.
+    """
+    def split_paragraph(paragraph: str) -> list[str]:
+        return _pack(paragraph.splitlines(), "\n", max_tokens, lambda line: _hard_split(line, max_tokens))
+
+    return _pack(_PARAGRAPH_BREAK.split(text), "\n\n", max_tokens, split_paragraph)
+
+
+def chars_for_tokens(max_tokens: int) -> int:
+    """Characters to read so that at least max_tokens tokens are available."""
+    return max_tokens * MAX_CHARS_PER_TOKEN
+
+
+def _clean_cut(text: str) -> str:
+    """
+    Shorten a token-truncated head to the last paragraph break, else sentence
+    end, else word boundary, as long as that keeps at least half of it.
+    """
+    floor = len(text) // 2
+    breaks = [m.start() for m in _PARAGRAPH_BREAK.finditer(text, floor)]
+    if breaks:
+        return text[:breaks[-1]].rstrip()
+    ends = [m.end() for m in _SENTENCE_END.finditer(text, floor)]
+    if ends:
+        return text[:ends[-1]]
+    space = text.rfind(" ", floor)
+    return text[:space].rstrip() if space > 0 else text
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """
+    Text cut to at most max_tokens tokens. Text over the budget is cut at a
+    paragraph or sentence end where possible rather than mid-word.
+    """
+    encoder = get_encoder()
+    if encoder is None:
+        limit = max_tokens * APPROX_CHARS_PER_TOKEN
+        if len(text) <= limit:
+            return text
+        return _clean_cut(text[:limit])
+    tokens = encoder.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    # A cut inside a multi-byte character decodes to U+FFFD.
+    return _clean_cut(encoder.decode(tokens[:max_tokens]).rstrip("\ufffd"))
@@ -0,0 +1,158 @@
+import asyncio
+import io
+import os
+import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable
+
+from fastapi import HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+
+from utils.artifacts import artifact_key, blob_response, etag, load, not_modified, save
+from utils.metrics import LOCAL_WORK
+
+TTS_MAX_WORKERS = int(os.getenv("TTS_MAX_WORKERS", "8"))
+TTS_CHUNK_CHARS = int(os.getenv("TTS_CHUNK_CHARS", "600"))
+# Chunks of one request being synthesized ahead of the consumer, so a long
+# text cannot take over the shared pool.
+TTS_WINDOW = int(os.getenv("TTS_WINDOW", "3"))
+# "gtts" calls Google; "silent" is a local stand-in that returns silent MP3
+# frames, for tests and offline benchmarks.
+TTS_BACKEND = os.getenv("TTS_BACKEND", "gtts")
+
+_executor = ThreadPoolExecutor(max_workers=TTS_MAX_WORKERS, thread_name_prefix="tts")
+
+_SENTENCE_END = re.compile(r"(?<=[.!?۔؟])\s+|\n+")
+
+# One MPEG-1 Layer III frame (32 kbps, 44.1 kHz, mono) with no audio data.
+_SILENT_FRAME = b"\xff\xfb\x10\xc0" + b"\x00" * 100
+
+
+def _gtts_synthesize(text: str, lang: str) -> bytes:
+    from gtts import gTTS
+
+    fp = io.BytesIO()
+    gTTS(text=text, lang=lang, slow=False).write_to_fp(fp)
+    return fp.getvalue()
+
+
+def _silent_synthesize(text: str, lang: str) -> bytes:
+    return _SILENT_FRAME * max(1, len(text) // 10)
+
+
+_BACKENDS: dict[str, Callable[[str, str], bytes]] = {
+    "gtts": _gtts_synthesize,
+    "silent": _silent_synthesize,
+}
+
+synthesize: Callable[[str, str], bytes] = _BACKENDS.get(TTS_BACKEND, _gtts_synthesize)
+
+
+def set_synthesizer(fn: Callable[[str, str], bytes]):
+    """Replace the blocking text -> MP3 function (e.g. with a local stand-in)."""
+    global synthesize
+    synthesize = fn
+
+
+def _timed_synthesize(text: str, lang: str) -> bytes:
+    with LOCAL_WORK.time("tts"):
+        return synthesize(text, lang)
+
+
+def split_sentences(text: str, max_chars: int = TTS_CHUNK_CHARS) -> list[str]:
+    """
+    Split text into chunks of at most max_chars, breaking at sentence ends.
+    A single sentence longer than max_chars is split at whitespace.
+    """
+    chunks: list[str] = []
+    current = ""
+    for sentence in _SENTENCE_END.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            chunks.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+async def stream_speech(text: str, lang: str = "en", window: int = TTS_WINDOW) -> AsyncIterator[bytes]:
+    """
+    Synthesize text chunk by chunk in the TTS thread pool, at most `window`
+    chunks ahead of the consumer. MP3 bytes are yielded in order as soon as
+    each chunk is ready.
+    """
+    chunks = split_sentences(text)
+    if not chunks:
+        raise ValueError("No text to speak")
+
+    loop = asyncio.get_running_loop()
+    pending = iter(chunks)
+    futures: deque[asyncio.Future] = deque()
+
+    def submit():
+        chunk = next(pending, None)
+        if chunk is not None:
+            futures.append(loop.run_in_executor(_executor, _timed_synthesize, chunk, lang))
+
+    for _ in range(max(1, window)):
+        submit()
+    try:
+        while futures:
+            audio = await futures[0]
+            futures.popleft()
+            submit()
+            yield audio
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+async def speech_response(
+    text: str, lang: str = "en", headers: dict | None = None, request: Request | None = None
+) -> Response:
+    """
+    MP3 audio for text, served from the artifact store when the same text was
+    spoken before. Otherwise streamed as it is synthesized and stored once
+    complete; the first chunk is awaited before responding so synthesis
+    failures still surface as an HTTP error.
+    """
+    key = artifact_key("tts", text, lang=lang, backend=TTS_BACKEND)
+    cached = not_modified(request, key)
+    if cached is not None:
+        return cached
+    blob = await load(key)
+    if blob is not None:
+        return blob_response(blob, key, "audio/mpeg", headers)
+
+    audio = stream_speech(text, lang)
+    try:
+        first = await anext(audio)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"TTS failed: {e}")
+
+    async def body():
+        parts = [first]
+        yield first
+        async for part in audio:
+            parts.append(part)
+            yield part
+        await save(key, b"".join(parts))
+
+    return StreamingResponse(body(), media_type="audio/mpeg", headers={**(headers or {}), "ETag": etag(key)})
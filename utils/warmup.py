@@ -0,0 +1,26 @@
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def warm_up():
+    """
+    Import the slow modules and build the model clients ahead of the first
+    request. Blocking; run it in a thread (see WARMUP_ON_START).
+    """
+    start = time.perf_counter()
+    from utils.language import detect_language
+    from utils.llm import ENDPOINT_TIMEOUTS, get_run_config
+    from utils.tokens import count_tokens
+
+    try:
+        for endpoint in ENDPOINT_TIMEOUTS:
+            get_run_config(endpoint)
+    except RuntimeError as e:
+        logger.warning(f"Warm-up skipped model clients: {e}")
+    import agents  # noqa: F401
+    from openai.types.responses import ResponseTextDeltaEvent  # noqa: F401
+    detect_language("warming up the language profiles")
+    count_tokens("warm up")
+    logger.info(f"Warm-up finished in {time.perf_counter() - start:.2f}s")
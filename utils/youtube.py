@@ -0,0 +1,107 @@
+import asyncio
+import json
+import os
+import re
+import tempfile
+
+from utils.metrics import cache_lookup
+
+TRANSCRIPT_CACHE_DIR = os.getenv("TRANSCRIPT_CACHE_DIR", os.path.join(".cache", "transcripts"))
+TRANSCRIPT_LINE_SECONDS = float(os.getenv("TRANSCRIPT_LINE_SECONDS", "30"))
+
+_VIDEO_ID = re.compile(
+    r"(?:youtube\.com/(?:watch\?(?:.*&)?v=|shorts/|embed/|live/|v/)|youtu\.be/)([A-Za-z0-9_-]{11})"
+)
+_BARE_ID = re.compile(r"^[A-Za-z0-9_-]{11}$")
+
+
+def extract_video_id(link: str) -> str | None:
+    link = link.strip()
+    if _BARE_ID.match(link):
+        return link
+    match = _VIDEO_ID.search(link)
+    return match.group(1) if match else None
+
+
+def _cache_path(video_id: str) -> str:
+    return os.path.join(TRANSCRIPT_CACHE_DIR, f"{video_id}.json")
+
+
+def _read_cache(video_id: str) -> list[dict] | None:
+    try:
+        with open(_cache_path(video_id), encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _write_cache(video_id: str, snippets: list[dict]):
+    os.makedirs(TRANSCRIPT_CACHE_DIR, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=TRANSCRIPT_CACHE_DIR, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(snippets, f, ensure_ascii=False)
+    os.replace(tmp, _cache_path(video_id))
+
+
+def _download_transcript(video_id: str) -> list[dict]:
+    from youtube_transcript_api import NoTranscriptFound, YouTubeTranscriptApi
+
+    transcripts = YouTubeTranscriptApi().list(video_id)
+    try:
+        transcript = transcripts.find_transcript(["en"])
+    except NoTranscriptFound:
+        transcript = next(iter(transcripts))
+    return [
+        {"text": s["text"], "start": float(s["start"]), "duration": float(s.get("duration", 0))}
+        for s in transcript.fetch().to_raw_data()
+    ]
+
+
+def get_transcript(video_id: str) -> list[dict]:
+    """
+    Transcript snippets ({text, start, duration}) for a video, fetched once
+    and then served from the on-disk cache. Dropping a JSON file named
+    <video_id>.json into TRANSCRIPT_CACHE_DIR works as a local fixture.
+    Raises youtube_transcript_api errors when no transcript is available.
+    """
+    snippets = _read_cache(video_id)
+    cache_lookup("transcript", snippets is not None)
+    if snippets is None:
+        snippets = _download_transcript(video_id)
+        _write_cache(video_id, snippets)
+    return snippets
+
+
+async def get_transcript_async(video_id: str) -> list[dict]:
+    return await asyncio.to_thread(get_transcript, video_id)
+
+
+def _timestamp(seconds: float) -> str:
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes:02d}:{secs:02d}"
+
+
+def format_transcript(snippets: list[dict], line_seconds: float = TRANSCRIPT_LINE_SECONDS) -> str:
+    """
+    Normalize snippets into "[mm:ss] text" lines, merging consecutive
+    snippets into lines of roughly line_seconds each.
+    """
+    lines = []
+    start, parts = None, []
+    for snippet in snippets:
+        text = " ".join(snippet["text"].split())
+        if not text:
+            continue
+        if start is None:
+            start = snippet["start"]
+        elif snippet["start"] - start >= line_seconds:
+            lines.append(f"[{_timestamp(start)}] {' '.join(parts)}")
+            start, parts = snippet["start"], []
+        parts.append(text)
+    if parts:
+        lines.append(f"[{_timestamp(start)}] {' '.join(parts)}")
+    return "\n".join(lines)